@@ -0,0 +1,2 @@
+# benchmark suite of the owais banking system
+# run with python -m benchmarks.run, see benchmarks/run.py
@@ -0,0 +1,60 @@
+# generates synthetic data files for the benchmarks
+# the same scale and seed always give the same files
+
+# importing modules
+import datetime
+import os
+import random
+
+# number of user accounts and transaction rows of each scale
+# account ids are 5 digits, so no scale can have more than 100000 accounts
+scales = {
+    '1k': (1000, 10000),
+    '100k': (100000, 1000000),
+    '1m': (100000, 10000000),
+}
+
+# transactions are dated between these days
+firstDay = datetime.date(2021, 1, 1).toordinal()
+lastDay = datetime.date(2022, 12, 31).toordinal()
+# every account starts with a balance that the benchmark withdrawals cannot use up
+startBalance = '1000000000'
+
+
+def accountIds(accounts):
+    # returns the ids of the user accounts of a dataset with accounts accounts
+    return ['%05d' % number for number in range(accounts)]
+
+
+def generate(path, accounts, transactions, seed=0):
+    # writes userPK.txt, userDB.txt, adminPK.txt, adminDB.txt, transactions.txt and transfers.txt into path
+    # accounts and transactions are integers, rows of transactions.txt are in date order
+    rng = random.Random(seed)
+    ids = accountIds(accounts)
+    if not os.path.exists(path):
+        os.makedirs(path)
+    with open(os.path.join(path, 'userPK.txt'), 'w') as pk, open(os.path.join(path, 'userDB.txt'), 'w') as db:
+        for id in ids:
+            pk.write(id + ',benchpass#0\n')
+            db.write(id + ',User ' + id + ',' + rng.choice(['savings', 'current']) + ',' + startBalance + ','
+                     + '%02d/%02d/%d' % (rng.randint(1, 28), rng.randint(1, 12), rng.randint(1950, 2000))
+                     + ',House ' + str(rng.randint(1, 999)) + ', Area ' + str(rng.randint(1, 50)) + ', Lilongwe, Malawi,\n')
+    with open(os.path.join(path, 'adminPK.txt'), 'w') as f:
+        f.write('00001,benchpass#0\n')
+    with open(os.path.join(path, 'adminDB.txt'), 'w') as f:
+        f.write('00001,Bench Admin,1,\n')
+    # the log is written a day at a time so it is in date order without sorting every row
+    days = lastDay - firstDay + 1
+    with open(os.path.join(path, 'transactions.txt'), 'w') as f:
+        written = 0
+        for day in range(days):
+            date = datetime.date.fromordinal(firstDay + day).strftime('%d/%m/%Y')
+            count = (transactions * (day + 1)) // days - written
+            lines = []
+            for row in range(count):
+                lines.append(date + ',' + rng.choice(ids) + ',' + rng.choice('wd') + ','
+                             + str(rng.randint(1, 5000)) + ',bench row\n')
+            f.write(''.join(lines))
+            written = written + count
+    with open(os.path.join(path, 'transfers.txt'), 'w') as f:
+        pass
@@ -0,0 +1,171 @@
+# times the hot paths of the banking engine on synthetic datasets and reports the results as JSON
+# usage: python -m benchmarks.run [scale ...] [--backend text|records|sqlite] [--iterations n] [--out file]
+# scales are the names in benchmarks.dataset.scales, 1k is used if none are given
+# each scale runs in its own process so its peak RSS and the engine's in-memory state are its own
+# the report is a list with one entry per scale:
+#   {"scale", "accounts", "transactions", "backend", "startupSeconds", "peakRssKb",
+#    "operations": {name: {"count", "errors", "opsPerSec", "p50Ms", "p99Ms"}}}
+
+# importing modules
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:
+    # not available on windows, peak RSS is then reported as null
+    resource = None
+
+from benchmarks.dataset import scales, generate, accountIds
+
+# operations that read every row of an account or draw many rows run fewer times
+slowOperations = ['genStat', 'table']
+
+
+def peakRss():
+    # returns the peak resident set size of this process in kilobytes, or None if it cannot be measured
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, linux reports kilobytes
+    if sys.platform == 'darwin':
+        peak = peak // 1024
+    return peak
+
+
+def percentile(ordered, fraction):
+    # returns the value at fraction (0 to 1) of the sorted list ordered
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def timeOperation(function, arguments):
+    # calls function once for every tuple in arguments and returns its statistics
+    # a call counts as an error when it returns a string that does not start with Successful
+    latencies = []
+    errors = 0
+    started = time.perf_counter()
+    for args in arguments:
+        before = time.perf_counter()
+        status = function(*args)
+        latencies.append(time.perf_counter() - before)
+        if isinstance(status, str) and not status.lower().startswith('successful'):
+            errors = errors + 1
+    total = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'count': len(latencies),
+        'errors': errors,
+        'opsPerSec': round(len(latencies) / total, 1) if total > 0 else None,
+        'p50Ms': round(percentile(latencies, 0.50) * 1000, 4),
+        'p99Ms': round(percentile(latencies, 0.99) * 1000, 4),
+    }
+
+
+def runScale(scale, backend, iterations, seed):
+    # generates the dataset of scale in a temporary directory and times every operation on it
+    accounts, transactions = scales[scale]
+    path = tempfile.mkdtemp(prefix='owaisbank-bench-')
+    try:
+        generate(path, accounts, transactions, seed)
+        if backend != '':
+            with open(os.path.join(path, 'bank.cfg'), 'w') as f:
+                f.write('[bank]\nbackend = ' + backend + '\n')
+        # the engine works on the files of the current directory
+        os.chdir(path)
+        from owaisbank import engine
+
+        # loading the account index, and the first statement which builds the transaction index,
+        # are one-off costs and are timed separately
+        started = time.perf_counter()
+        if backend == 'records':
+            engine.useRecordStore()
+        engine.loadIndexes()
+        devnull = open(os.devnull, 'w')
+        engine.genStat('00000', '01/01/2021', '31/12/2022', devnull)
+        startup = time.perf_counter() - started
+
+        rng = random.Random(seed)
+        ids = accountIds(accounts)
+        pairs = []
+        for i in range(iterations):
+            pairs.append(rng.sample(ids, 2))
+        fewer = max(1, iterations // 20)
+        rows = []
+        for record in engine.getIndex('userDB.txt')['records'][:50]:
+            rows.append(record[:4])
+        operations = {}
+        operations['findLine'] = timeOperation(engine.findLine, [('userPK.txt', a) for a, b in pairs])
+        operations['read'] = timeOperation(engine.read, [(a, 'userDB.txt', '3') for a, b in pairs])
+        operations['edit'] = timeOperation(engine.edit, [(a, '5', 'Bench Street') for a, b in pairs])
+        operations['withdraw'] = timeOperation(engine.withdraw, [(a, '1', 'bench') for a, b in pairs])
+        operations['deposit'] = timeOperation(engine.deposit, [(a, '1', 'bench') for a, b in pairs])
+        operations['transfer'] = timeOperation(engine.transfer, [('00001', a, b, '1', 'bench') for a, b in pairs])
+        operations['genStat'] = timeOperation(engine.genStat, [(a, '01/01/2021', '31/12/2022', devnull)
+                                                               for a, b in pairs[:fewer]])
+        operations['table'] = timeOperation(engine.table, [('BENCH', rows, devnull) for i in range(fewer)])
+        devnull.close()
+        return {
+            'scale': scale,
+            'accounts': accounts,
+            'transactions': transactions,
+            'backend': backend or 'default',
+            'iterations': iterations,
+            'seed': seed,
+            'python': sys.version.split()[0],
+            'startupSeconds': round(startup, 4),
+            'peakRssKb': peakRss(),
+            'operations': operations,
+        }
+    finally:
+        os.chdir(tempfile.gettempdir())
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def main(args):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.run')
+    parser.add_argument('scales', nargs='*', help='any of ' + ', '.join(scales))
+    parser.add_argument('--backend', default='', choices=['', 'text', 'records', 'sqlite'])
+    parser.add_argument('--iterations', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='')
+    # runs a single scale in this process and prints its result, used by the parent process
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    options = parser.parse_args(args)
+    if options.scales == []:
+        options.scales = ['1k']
+    for scale in options.scales:
+        if scale not in scales:
+            parser.error('unknown scale: ' + scale)
+
+    if options.child:
+        print(json.dumps(runScale(options.scales[0], options.backend, options.iterations, options.seed)))
+        return
+
+    results = []
+    for scale in options.scales:
+        command = [sys.executable, '-m', 'benchmarks.run', scale, '--child', '--backend', options.backend,
+                   '--iterations', str(options.iterations), '--seed', str(options.seed)]
+        # the child must be able to import both packages from the root of the repository
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ)
+        env['PYTHONPATH'] = root + os.pathsep + env.get('PYTHONPATH', '')
+        output = subprocess.run(command, env=env, stdout=subprocess.PIPE, check=True).stdout
+        results.append(json.loads(output))
+
+    report = json.dumps(results, indent=2)
+    if options.out != '':
+        with open(options.out, 'w') as f:
+            f.write(report + '\n')
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,9 @@
+# owais banking system package
+# the engine functions are re-exported here so they can be imported directly from owaisbank
+# the interactive menu lives in owaisbank.cli
+
+from owaisbank.engine import (findLine, loadIndexes, buildIndex, dropIndex, compact, validateID, validatePass,
+                              validateType, validateDate, validateBranch, createUser, createAdmin, read, edit, delete,
+                              withdraw, deposit, post, batchPost, transfer, changePass, useRecordStore, usePartitions,
+                              useColumnStore, archiveHistory, table, showUsers, genStat, summaryRows, genSummary)
+from owaisbank.workers import runParallel
@@ -0,0 +1,4 @@
+# allows the system to be started with python -m owaisbank
+from owaisbank.cli import main
+
+main()
@@ -0,0 +1,85 @@
+# compressed archive of old transaction history
+# months of the partitioned transaction log (see owaisbank.partitions) dated before a cutoff are moved out of
+# txparts into one compressed segment each in the txarchive folder, such as txarchive/2021-12.txt.gz,
+# so the hot partitions stay small while statements still read archived months, one row at a time
+# segments are gzip (.gz) or lzma (.xz) files holding the rows exactly as they were in the partition
+# the manifest of owaisbank.partitions is the index of the archive, it names the segment of each archived month
+# segments are never changed once written, archiving a month again writes a new segment with the next generation
+# number in its name (txarchive/2021-12.2.txt.gz after txarchive/2021-12.txt.gz) and the old one is only deleted
+# once the manifest names the new one, so a crash in between leaves the month as it was
+# segments are opened with open() and decompressed from the open file, so metrics counts the compressed bytes
+
+# importing modules
+import gzip
+import lzma
+import os
+from contextlib import contextmanager
+
+archiveFolder = 'txarchive'
+# {compression: (file extension, module)}
+compressions = {'gzip': ('.gz', gzip), 'lzma': ('.xz', lzma)}
+
+
+def segmentPath(segment):
+    return os.path.join(archiveFolder, segment)
+
+
+def segmentGeneration(segment):
+    # returns the generation number of a segment, the first segment of a month has none in its name and is 1
+    parts = segment.split('.')
+    if len(parts) > 3 and parts[1].isdigit():
+        return int(parts[1])
+    return 1
+
+
+def segmentName(name, compression, previous=''):
+    # returns the file name of a new segment of partition name, compression is gzip or lzma
+    # previous is the segment it replaces, '' if the month has not been archived before
+    if previous == '':
+        return name + '.txt' + compressions[compression][0]
+    return name + '.' + str(segmentGeneration(previous) + 1) + '.txt' + compressions[compression][0]
+
+
+def segmentModule(segment):
+    # returns the compression module of a segment, chosen by its file extension
+    for extension, module in compressions.values():
+        if segment.endswith(extension):
+            return module
+    raise ValueError('unknown archive segment: ' + segment)
+
+
+@contextmanager
+def openSegment(segment):
+    # holds a segment open for reading for the duration of a with block, decompressed as it is read
+    # seeking forward only decompresses up to the new position, seeking back starts again from the beginning
+    with open(segmentPath(segment), 'rb') as raw:
+        with segmentModule(segment).open(raw, 'rb') as f:
+            yield f
+
+
+def readSegment(segment):
+    # generator of the rows of a segment as byte strings with their line breaks, decompressed as they are read
+    with openSegment(segment) as f:
+        for line in f:
+            yield line
+
+
+def writeSegment(segment, lines):
+    # writes lines (byte strings with their line breaks) to segment
+    # the segment is written to a temporary file and synced to disk first, so it is complete before
+    # the manifest points to it and the partition it replaces is deleted
+    if not os.path.isdir(archiveFolder):
+        os.mkdir(archiveFolder)
+    path = segmentPath(segment)
+    with open(path + '.tmp', 'wb') as raw:
+        with segmentModule(segment).open(raw, 'wb') as f:
+            f.write(b''.join(lines))
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(path + '.tmp', path)
+
+
+def removeSegment(segment):
+    # deletes a segment that is no longer in the manifest
+    if os.path.exists(segmentPath(segment)):
+        os.remove(segmentPath(segment))
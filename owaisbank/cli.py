@@ -0,0 +1,516 @@
+# interactive command line interface of the owais banking system
+# commands take in user input, pass it to the engine functions and print the result
+
+# importing modules
+import os
+import sys
+
+from owaisbank.engine import (loadIndexes, dropIndex, createUser, createAdmin, read, edit, delete, withdraw, deposit,
+                              transfer, changePass, showUsers, genStat, genSummary, table, archiveHistory,
+                              useColumnStore)
+from owaisbank.journal import clearJournal
+from owaisbank.locks import storeLock, enableProcessLocks
+from owaisbank.metrics import configureMetrics
+from owaisbank.sessions import Session, accountExists
+from owaisbank.statements import bulkStatements
+
+# the logged in account is kept in a Session object (see owaisbank.sessions) made by main()
+# and passed to the commands that act on it
+
+
+def morePrompt():
+    # asks whether to show the next page of a long table
+    return input('-- press enter for more, q to stop --\n') not in ['q', 'Q']
+
+
+def terminalPager():
+    # returns the pager for long tables, which only pauses when a person is reading the screen
+    if sys.stdin.isatty() and sys.stdout.isatty():
+        return morePrompt
+    return None
+
+
+# commands functions
+# These take in user input, format it in arguments required by their respective function,
+# and give output accordingly
+
+def showCommand(session, v=0):
+    # shows user/admin the specified account information
+    # user can only view their own account information
+    # v can only be the integer 0 or 1
+
+    # v = 1 is the admin version of this command
+    colNames = ['id', 'name', 'type', 'balance', 'date of birth', 'country']
+    print('You can view your account properties here')
+    print('account properties include: ', end='')
+    print('id,name,account type,balance, date of birth and country')
+    # assign id from the session
+    if v == 1:
+        id = input('Enter user account id\n')
+    elif v == 0:
+        id = session.id
+    # user database is used in this account
+    db = 'userDB.txt'
+    # determine the field to display
+    print('enter field to display:\n')
+    col = input('0:all\n1:id\n2:name\n3:type\n4:balance\n5:dob\n6:country\n7:exit\n')
+    # ensure that col is an integer as this validation does not exist in read()
+    try:
+        int(col)
+    except ValueError:
+        print('Error:invalid input')
+        return 0
+
+    # if not (int(col) in [0, 1, 2, 3, 4, 5, 6, 7]):
+    #     print('Error:invalid column. Try again')
+    #     # exit the code
+    #     return 0
+    if col == '7':
+        # exit the code
+        return 'exit'
+    elif col == '0':
+        col = 'all'
+    # else do not change the value of col
+    # extract required column name for single field value
+    else:
+        # convert to list as it will be used in table command
+        col = str(int(col) - 1)
+    # read() outputs in the form of list so no need for conversions
+    contents = read(id, db, col)
+    # validation checks
+    if contents == -1:
+        print('Error: database does not exist')
+        return 0
+    elif contents == -2:
+        print('Error: account does not exist')
+        return 0
+    elif contents == -3:
+        print('Error: invalid input')
+        return 0
+
+    # colNames will be single value if not all values are printed
+    if col != 'all':
+        colNames = [colNames[int(col)]]
+    table(id + ' User Table', [colNames, contents])
+    # all needed values have been taken from user
+
+
+def createUserCommand():
+    # creates a user entry, is used only by admin account
+
+    id = input('Enter account ID\n')
+    name = input('Enter customer full name\n')
+    passwd = 'defaultpass#0'
+    type = input('Enter type of account - 0 for current, 1 for savings:\n')
+    balance = '100'
+    dob = input('Enter Date of Birth(dd/mm/yyyy):\n')
+    address = input("Enter address\n")
+    if type == '0':
+        type = 'savings'
+    elif type == '1':
+        type = 'current'
+
+    status = createUser(id, name, passwd, type, balance, dob, address)
+    print(status)
+
+
+def withdrawCommand(session):
+    # withdraws money from user account and creates entry in database
+
+    value = input('Enter value to withdraw\n')
+    passwd = input('Enter password to confirm transaction\n')
+    id = session.id
+    # check if password matches
+    if not session.confirm(passwd):
+        print('Error: Password does not match')
+        return 0
+    desc = input('Enter description\n')
+    status = withdraw(id, value, desc)
+    print(status)
+    if status == 'Successful':
+
+        balance = read(id, 'userDB.txt', '3')[0]
+        print(value, 'dollars have been withdrawn, new balance is', balance)
+
+
+
+def depositCommand(session):
+    # withdraws money from user account and creates entry in database
+    value = input('Enter value to deposit\n')
+    passwd = input('Enter password to confirm transaction\n')
+    id = session.id
+    # check if password matches
+    if not session.confirm(passwd):
+        print('Error: Password does not match')
+        return 0
+    desc = input('Enter description\n')
+    status = deposit(id, value, desc)
+    print(status)
+    if status == 'Successful':
+        balance = read(id, 'userDB.txt', '3')[0]
+        print(value, 'dollars have been deposited, new balance is', balance)
+
+
+def genStatCommand(session, v=0):
+    # generates electronic statement of accounts
+    # v is the integer 0 or 1
+    # v=1 is administrator version
+    if v == 0:
+        id = session.id
+    elif v == 1:
+        id = input('Enter id\n')
+    sdate = input('Enter start date(dd/mm/yyyy)\n')
+    edate = input('Enter end date(dd/mm/yyyy)\n')
+    status = genStat(id, sdate, edate, pager=terminalPager())
+    print(status)
+
+
+def summaryCommand(session, v=0):
+    # shows the daily or monthly totals and closing balances of an account
+    # v is the integer 0 or 1
+    # v=1 is administrator version
+    if v == 0:
+        id = session.id
+    elif v == 1:
+        id = input('Enter id\n')
+    period = input('Enter d for daily or m for monthly totals\n')
+    sdate = input('Enter start date(dd/mm/yyyy)\n')
+    edate = input('Enter end date(dd/mm/yyyy)\n')
+    status = genSummary(id, period, sdate, edate)
+    print(status)
+
+
+def bulkStatementsCommand():
+    # writes the statement of every user account into its own file, used at month end by the admin
+    sdate = input('Enter start date(dd/mm/yyyy)\n')
+    edate = input('Enter end date(dd/mm/yyyy)\n')
+    directory = input('Enter the folder to write the statements to (leave empty for statements)\n')
+    if directory == '':
+        directory = 'statements'
+    status = bulkStatements(sdate, edate, directory)
+    print(status)
+
+
+def changePassCommand(session):
+    # changes the password of user account
+    id = session.id
+    if not accountExists('user', id):
+        print('Error: account does not exist')
+        return 0
+    oldpass = input('Enter existing password\n')
+    # check if oldPass matches
+    print()
+    if not session.confirm(oldpass):
+        print('Error: Wrong Password')
+        return 0
+
+    newpass = input('Enter new password\n')
+    # change the password, changePass() validates it
+    status = changePass(id, newpass)
+    print(status)
+
+
+def createAdminCommand():
+    # create new admin record in Admin database, only used by superuser
+    id = input('Enter account ID\n')
+    name = input('Enter employee full name\n')
+    passwd = input('Enter Password\n')
+    branch = input('Enter employee branch\n')
+    status = createAdmin(id, name, passwd, branch)
+    print(status)
+
+
+def deleteAdminCommand():
+    # deletes admin in Admin database, only used by superuser
+    id = input('Enter adminstrator account id to delete\n')
+    confirmation = input('are you sure? Y/N\n')
+    if confirmation == 'N' or confirmation == 'n':
+        print('Acknowledged')
+        return 0
+    elif confirmation == 'Y' or confirmation == 'y':
+        status = delete(id, 1)
+        print(status)
+    else:
+        print('invalid value provided. Please try again')
+
+
+def clearCommand():
+    # clears contents of specified database
+    print('Choose which history file to clear')
+    files = os.listdir()
+    index = 0
+    for file in files:
+        print(index, ':', end='')
+        print(file)
+        index += 1
+
+    fileToDel = input('Choose which file to clear\n')
+
+    # validations
+    try:
+        fileToDel = int(fileToDel)
+    except ValueError:
+        print('Error: Invalid value')
+        return 0
+    if not (0 <= fileToDel < len(files)):
+        print('Error: Invalid value')
+        return 0
+    # the python file and the owaisbank package must not be cleared
+    if files[fileToDel] == 'MOHAMMAD_OWAIS_NOOR_BUTT_TP066233.py' or os.path.isdir(files[fileToDel]):
+        print('Error: you cannot tamper with the system file')
+        return 0
+    with storeLock:
+        with open(files[fileToDel], 'w') as f:
+            f.write('')
+        dropIndex(files[fileToDel])
+        # journaled changes belong to the accounts that were just cleared
+        if files[fileToDel] == 'userDB.txt':
+            clearJournal()
+    print('Successful')
+
+
+def archiveCommand():
+    # moves old transaction history into the compressed archive, only used by superuser
+    # unlike clearing transactions.txt the history is kept and statements still show it
+    cutoff = input('Archive the months before which date? (dd/mm/yyyy)\n')
+    status = archiveHistory(cutoff)
+    print(status)
+
+
+def columnStoreCommand():
+    # creates the columnar copy of the transaction log that statements are measured from, only used by superuser
+    # numpy must be installed
+    status = useColumnStore()
+    print(status)
+
+
+def deleteUserCommand():
+    # deletes user from user database, only used by admin
+    id = input('Enter user account id to delete\n')
+    confirmation = input('are you sure? Y/N\n')
+    if confirmation == 'N' or confirmation == 'n':
+        print('Acknowledged')
+        return 0
+    elif confirmation == 'Y' or confirmation == 'y':
+        status = delete(id, 0)
+        print(status)
+    else:
+        print('invalid value provided. Please try again')
+
+
+def transferCommand(session):
+    # transfers funds between two users, only used by admin
+    id = session.id
+    sender = input('Enter sender ID\n')
+    receiver = input('Enter receiver ID\n')
+    value = input('Enter value to transfer\n')
+    desc = input('Enter description\n')
+    status = transfer(id, sender, receiver, value, desc)
+    print(status)
+
+
+def editCommand():
+    # edits user field value, only used by admin
+    # only the following values can be edited
+    id = input('enter account ID\n')
+    print('Enter column index:\n0:date of birth\n1:address')
+    col = input()
+    if col == '0':
+        colIndex = '4'
+    elif col == '1':
+        colIndex = '5'
+    else:
+        print('Error: invalid input')
+        return 0
+    value = input('Enter value\n')
+    status = edit(id, colIndex, value)
+    print(status)
+
+
+def adminProcess(command, session):
+    # Takes in command input and passes it to respective command function
+    # session is the Session of the logged in admin
+    if command == '1':
+        showCommand(session, 1)
+    if command == '2':
+        createUserCommand()
+    if command == '3':
+        deleteUserCommand()
+    if command == '4':
+        editCommand()
+    if command == '5':
+        genStatCommand(session, 1)
+    if command == '6':
+        transferCommand(session)
+    if command == '7':
+        showUsers(pager=terminalPager())
+    if command == '8':
+        summaryCommand(session, 1)
+    if command == '9':
+        bulkStatementsCommand()
+
+
+def suProcess(command):
+    # Takes in command input and passes it to respective command function
+    if command == '1':
+        createAdminCommand()
+    elif command == '2':
+        deleteAdminCommand()
+    elif command == '3':
+        clearCommand()
+    elif command == '4':
+        archiveCommand()
+    elif command == '5':
+        columnStoreCommand()
+
+
+def userProcess(command, session):
+    # Takes in command input and passes it to respective command function
+    # session is the Session of the logged in user
+
+    if command == '1':
+        showCommand(session)
+    elif command == '2':
+        withdrawCommand(session)
+    elif command == '3':
+        depositCommand(session)
+    elif command == '4':
+        changePassCommand(session)
+    elif command == '5':
+        genStatCommand(session)
+    elif command == '6':
+        summaryCommand(session)
+
+
+def main():
+    # main loop
+    # several sessions may run against the same data files, so take the process locks where possible
+    enableProcessLocks()
+    # turn on the instrumentation if bank.cfg asks for it
+    configureMetrics()
+    # read the account files once so every lookup after this is served from memory
+    loadIndexes()
+    session = Session()
+    running = True
+    while running:
+        # used to prevent execution of of following code if wrong accType is entered
+        accepted = True
+        # asks and determines which account user wishes to log into
+        print('\n==========OWAIS BANKING SYSTEM V2==========\n')
+        print('\n==========LOG IN PAGE==========\n')
+
+        accType = input('Enter your account type:\n0 - SuperUser\n1 - Administrator\n2 - User\n')
+
+        # validation
+        if accType != '0' and accType != '1' and accType != '2':
+            print('Error: Enter 0,1,2')
+            accepted = False
+
+        while accepted:
+
+            # unlike admin and user, superuser does not have an associated database
+            if accType == '0':
+                passwd = input('Enter password\n')
+                if session.login('super', 'SU', passwd):
+                    print('Log in successful')
+                    while True:  # continous loop for super user menu
+                        print('1:create account\n2:delete account\n3:clear database\n4:archive transaction history')
+                        print('5:build columnar transaction store\n')
+                        command = input()
+                        # ensure input is a number
+                        if command == 'q' or command == 'Q':
+                            break
+                        try:
+                            int(command)
+                        except ValueError:
+                            print('Error: Invalid input\n')
+                            continue  # skip the rest of the code and restart
+
+                        # range check
+                        if 0 < int(command) <= 5:
+                            suProcess(command)
+                            # go to the next instance
+                        else:
+                            print('Error:invalid input\n')
+
+                    # break out of second loop
+                    break  # do not execute following code as it is reserved for other 2 accounts
+                else:
+                    print('wrong password')
+                    break
+
+                    # log in
+            id = input('Enter account ID(Q to exit)\n')
+
+            # check if account type exists (only for admin and user accounts)
+            if accType == '1':
+                type = 'admin'
+            elif accType == '2':
+                type = 'user'
+
+            # Q is used to exit the loop
+            if id == 'Q' or id == 'q':
+                break
+
+            # check if the id exists in the id database
+            # this is a lookup in the account index, which also covers accounts in the record store
+            # if account exists, check the password else tell the user to re-enter credentials
+            if accountExists(type, id):
+
+                passwd = input('Enter password\n')
+                # check if the password matches
+                # the session remembers the account for the commands that follow
+
+                if session.login(type, id, passwd):
+                    # password matches
+                    print('Log in successful')
+                    if accType == '2':
+                        while True:
+                            print('\n===========USER MODE===========\n')
+                            command = input(
+                                'WHAT WOULD YOU LIKE TO DO?\n1:show property\n2:withdraw\n3:deposit\n4:change password\n5:generate statement of accounts\n6:account summary\n')
+                            # validation
+                            if command == 'q' or command == 'Q':
+                                break
+                            # ensure input is a number
+                            try:
+                                int(command)
+                            except ValueError:
+                                print('Error: Invalid input')
+                                continue  # skips remaining code and shifts to next line
+
+                            # range check
+                            if 1 <= int(command) <= 6:
+                                userProcess(command, session)
+                            else:
+                                print('Error: Invalid input')
+                    elif accType == '1':
+                        while True:
+                            print('\n===========ADMINISTRATOR MODE===========\n')
+                            print('WHAT WOULD YOU LIKE TO DO?')
+                            print('1:show user property\n2:create user account\n3:delete\n4:edit user property')
+                            print('5:generate user statement\n6:transfer\n7:show all users and passwords\n8:account summary\n9:statements for all users\n')
+                            command = input()
+                            # validation
+                            # ensure input is a number
+                            if command == 'q' or command == 'Q':
+                                break
+                            try:
+                                int(command)
+                            except ValueError:
+                                print('Error: Invalid input')
+                                continue  # skips remaining code and shifts to next line
+
+                            # range check
+                            if 0 <= int(command) <= 9:
+                                adminProcess(command, session)
+                            else:
+                                print('Error: Invalid input')
+                else:
+                    print('Error: Password does not match! try again')
+
+            else:
+                print('Error:account non-existent, please try again')
+                break
+        # end the session
+        session.logout()
@@ -0,0 +1,234 @@
+# optional columnar copy of transactions.txt for fast date range queries
+# each field is stored in its own file inside the txcolumns folder:
+# dates.i4 (int32 date ordinals), ids.i4 (int32 account ids), types.u1 (the byte w or d),
+# amounts.i8 (int64 values), descs.bin (descriptions joined together) and descends.i8 (int64 end of each description)
+# the files are memory mapped and filtered with numpy so a range of millions of rows is summed without a python loop
+# the store is only used once it has been created with useColumnStore() in the engine (the superuser menu has a
+# command for it) and numpy is installed
+# like the transaction index, it is checked against the size of transactions.txt before it is used
+# the lowest and highest date of each block of blockRows rows are kept in memory, so a query only filters the
+# blocks that overlap its date range, the log is appended in date order so old ranges are a few blocks
+
+# importing modules
+import os
+
+from owaisbank.locks import storeLock
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+transactionFile = 'transactions.txt'
+columnFolder = 'txcolumns'
+# number of bytes of transactions.txt converted at a time
+chunkSize = 1 << 20
+# number of rows in a block of the date range filter
+blockRows = 1 << 16
+# file name and numpy type of each fixed-width column
+columns = [('dates.i4', '<i4'), ('ids.i4', '<i4'), ('types.u1', 'u1'), ('amounts.i8', '<i8'), ('descends.i8', '<i8')]
+# [generation, lowest dates, highest dates] of the whole blocks of dates.i4 measured so far, see dateBlocks()
+blocks = None
+
+
+def columnPath(name):
+    return os.path.join(columnFolder, name)
+
+
+def readCovered():
+    # returns the number of bytes of transactions.txt in the store, the length of the description heap and the
+    # generation of the store, which goes up every time the store is created again
+    # stores made before there was a generation are generation 0
+    with open(columnPath('meta.txt'), 'r') as f:
+        meta = f.read().split(',')
+    if len(meta) < 3:
+        meta.append('0')
+    return int(meta[0]), int(meta[1]), int(meta[2])
+
+
+def writeCovered(covered, heapSize, generation):
+    with open(columnPath('meta.txt'), 'w') as f:
+        f.write('{0},{1},{2}'.format(covered, heapSize, generation))
+
+
+def convertLines(lines, heapSize):
+    # converts raw rows of transactions.txt to column arrays
+    # lines is a list of byte strings including their line breaks
+    # returns the arrays in the order of columns, the description heap and the number of bytes used
+    from owaisbank.dates import dateOrdinal
+    dates = []
+    ids = []
+    types = []
+    amounts = []
+    descEnds = []
+    heap = []
+    used = 0
+    for line in lines:
+        # an unfinished last row is left for the next sync
+        if not line.endswith(b'\n'):
+            break
+        used += len(line)
+        row = line.decode().replace('\r\n', '\n').split(',')
+        if len(row) < 5:
+            continue
+        ordinal = dateOrdinal(row[0])
+        try:
+            amount = int(row[3])
+            id = int(row[1])
+        except ValueError:
+            continue
+        if ordinal == -1:
+            continue
+        desc = row[4][:len(row[4]) - 1].encode()
+        heapSize += len(desc)
+        dates.append(ordinal)
+        ids.append(id)
+        types.append(ord(row[2][0:1] or ' '))
+        amounts.append(amount)
+        descEnds.append(heapSize)
+        heap.append(desc)
+    arrays = [dates, ids, types, amounts, descEnds]
+    for index in range(len(arrays)):
+        arrays[index] = numpy.array(arrays[index], dtype=columns[index][1])
+    return arrays, b''.join(heap), used
+
+
+def appendLines(lines, covered, heapSize, generation):
+    # appends converted rows to every column file and records the new coverage
+    arrays, heap, used = convertLines(lines, heapSize)
+    for index in range(len(columns)):
+        with open(columnPath(columns[index][0]), 'ab') as f:
+            arrays[index].tofile(f)
+    with open(columnPath('descs.bin'), 'ab') as f:
+        f.write(heap)
+    writeCovered(covered + used, heapSize + len(heap), generation)
+
+
+def exportColumns():
+    # creates (or recreates) the columnar store from transactions.txt
+    # returns an error message if numpy is not installed
+    if numpy is None:
+        return 'Error: numpy is required for the columnar store'
+    if not os.path.isdir(columnFolder):
+        os.mkdir(columnFolder)
+    generation = 1
+    if os.path.exists(columnPath('meta.txt')):
+        generation = readCovered()[2] + 1
+    for name, dtype in columns:
+        open(columnPath(name), 'wb').close()
+    open(columnPath('descs.bin'), 'wb').close()
+    writeCovered(0, 0, generation)
+    syncColumns()
+    return 'Successful'
+
+
+def syncColumns():
+    # adds rows appended to transactions.txt since the last sync, or rebuilds the store if it was truncated
+    with storeLock:
+        covered, heapSize, generation = readCovered()
+        size = 0
+        if os.path.exists(transactionFile):
+            size = os.path.getsize(transactionFile)
+        if size < covered:
+            exportColumns()
+            return
+        if size > covered:
+            # the rows are converted a chunk at a time so a long log is never held in memory
+            with open(transactionFile, 'rb') as f:
+                f.seek(covered)
+                while True:
+                    lines = f.readlines(chunkSize)
+                    if lines == []:
+                        break
+                    appendLines(lines, covered, heapSize, generation)
+                    covered, heapSize, generation = readCovered()
+
+
+def available():
+    # returns True when the columnar store exists and can be queried
+    return numpy is not None and os.path.exists(columnPath('meta.txt'))
+
+
+def rowsAppended(lines, start):
+    # keeps the store in step with rows that were just appended to transactions.txt
+    # does nothing if the store has not been created
+    if not available():
+        return
+    covered, heapSize, generation = readCovered()
+    if covered != start:
+        syncColumns()
+        return
+    encoded = []
+    for line in lines:
+        encoded.append(line.encode())
+    appendLines(encoded, covered, heapSize, generation)
+
+
+def loadColumn(name, dtype):
+    # memory maps a column file, numpy cannot map an empty file so an empty array is returned instead
+    if os.path.getsize(columnPath(name)) == 0:
+        return numpy.zeros(0, dtype=dtype)
+    return numpy.memmap(columnPath(name), dtype=dtype, mode='r')
+
+
+def dateBlocks(dates):
+    # returns the lowest and highest date of each block of blockRows rows of dates, the last block may be shorter
+    # whole blocks are only measured once, unless the store has been created again since
+    global blocks
+    generation = readCovered()[2]
+    if blocks is None or blocks[0] != generation or len(blocks[1]) * blockRows > len(dates):
+        blocks = [generation, numpy.zeros(0, dtype='<i4'), numpy.zeros(0, dtype='<i4')]
+    measured = len(blocks[1]) * blockRows
+    whole = len(dates) // blockRows * blockRows
+    if whole > measured:
+        new = numpy.asarray(dates[measured:whole]).reshape(-1, blockRows)
+        blocks[1] = numpy.concatenate([blocks[1], new.min(axis=1)])
+        blocks[2] = numpy.concatenate([blocks[2], new.max(axis=1)])
+    lows = blocks[1]
+    highs = blocks[2]
+    if len(dates) > whole:
+        lows = numpy.append(lows, dates[whole:].min())
+        highs = numpy.append(highs, dates[whole:].max())
+    return lows, highs
+
+
+def selectRows(id, sdate, edate):
+    # returns the positions of the rows of account id dated between the ordinals sdate and edate inclusive
+    # only the blocks whose dates overlap the range are filtered
+    syncColumns()
+    dates = loadColumn('dates.i4', '<i4')
+    ids = loadColumn('ids.i4', '<i4')
+    lows, highs = dateBlocks(dates)
+    parts = [numpy.zeros(0, dtype=numpy.intp)]
+    for block in numpy.nonzero((lows <= edate) & (highs >= sdate))[0]:
+        start = int(block) * blockRows
+        end = start + blockRows
+        blockDates = dates[start:end]
+        found = numpy.nonzero((ids[start:end] == int(id)) & (blockDates >= sdate) & (blockDates <= edate))[0]
+        parts.append(found + start)
+    selected = numpy.concatenate(parts)
+    # put the rows in date order, rows with the same date stay in file order like the transaction index
+    return selected[numpy.lexsort((selected, dates[selected]))]
+
+
+def rangeSummary(id, sdate, edate):
+    # summarises the rows of account id between the ordinals sdate and edate without a python loop
+    # returns [count, change, lowest, highest, widest amount, widest description]
+    # change is the total of deposits minus withdrawals, lowest and highest are the extremes of the running change
+    # (starting from 0) and the widths are in characters, as needed by genStat()
+    # description widths are counted in bytes, which is the same for plain text descriptions
+    selected = selectRows(id, sdate, edate)
+    if len(selected) == 0:
+        return [0, 0, 0, 0, 0, 0]
+    types = loadColumn('types.u1', 'u1')[selected]
+    amounts = loadColumn('amounts.i8', '<i8')[selected]
+    descEnds = loadColumn('descends.i8', '<i8')
+    signs = numpy.where(types == ord('w'), -1, numpy.where(types == ord('d'), 1, 0))
+    running = numpy.cumsum(amounts * signs)
+    # amounts are written without leading zeros so their widths are the widths of the largest and smallest
+    amountWidth = max(len(str(int(amounts.max()))), len(str(int(amounts.min()))))
+    # description lengths are the differences between consecutive end offsets
+    descStarts = numpy.where(selected > 0, descEnds[numpy.maximum(selected - 1, 0)], 0)
+    descWidth = int((descEnds[selected] - descStarts).max())
+    return [len(selected), int(running[len(running) - 1]), min(0, int(running.min())), max(0, int(running.max())),
+            amountWidth, descWidth]
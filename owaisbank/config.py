@@ -0,0 +1,47 @@
+# settings of the banking system, read from bank.cfg in the current directory
+# bank.cfg is an ini file with a [bank] section, for example:
+#   [bank]
+#   backend = sqlite
+#   database = bank.db
+# backend is text, records or sqlite and decides where accounts and transactions are kept
+# (left out, records is used if accounts.dat exists and text otherwise)
+# database is the sqlite database file used by the sqlite backend
+# metrics = on turns on the instrumentation in owaisbank.metrics, and metrics_interval is the number of seconds
+# between the summary lines it then writes to standard error (left out, no lines are written)
+# retention_months is the number of whole months before the current one that are kept in the transaction log
+# partitions, older months are archived when a new month starts (left out, they are only archived on request),
+# and archive_compression is gzip or lzma, the compression of the archive (see owaisbank.archive)
+# durability (none, write or fsync), commit_interval and commit_rows decide how the transaction and transfer
+# logs are written in groups, see owaisbank.logwriter
+# missing settings and a missing bank.cfg fall back to the defaults
+
+# importing modules
+import configparser
+import os
+
+configFile = 'bank.cfg'
+defaults = {'backend': '', 'database': 'bank.db', 'metrics': '', 'metrics_interval': '',
+            'retention_months': '', 'archive_compression': 'gzip',
+            'durability': 'write', 'commit_interval': '', 'commit_rows': ''}
+# settings read from bank.cfg, None until they are read
+settings = None
+
+
+def loadConfig():
+    # reads bank.cfg, or uses the defaults if it does not exist
+    global settings
+    settings = dict(defaults)
+    if os.path.exists(configFile):
+        parser = configparser.ConfigParser()
+        parser.read(configFile)
+        if parser.has_section('bank'):
+            for name, value in parser.items('bank'):
+                settings[name] = value.strip()
+    return settings
+
+
+def setting(name):
+    # returns the value of a setting as a string
+    if settings is None:
+        loadConfig()
+    return settings.get(name, '')
@@ -0,0 +1,67 @@
+# parsing of dd/mm/yyyy dates
+# dates are turned into ordinals (the number of days since 01/01/0001, as datetime.date.toordinal())
+# so date ranges are compared as integers instead of datetime objects
+# the transaction log only holds a few distinct dates, so parsed dates are kept in a bounded cache
+
+# importing modules
+import datetime
+from functools import lru_cache
+
+# number of distinct date strings kept in the cache, about 27 years of days
+cacheSize = 10000
+# days before the first of each month in a year that is not a leap year
+daysBefore = [0, 0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334]
+daysIn = [0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+
+
+def isLeap(year):
+    # year is an integer
+    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+
+
+@lru_cache(maxsize=cacheSize)
+def dateOrdinal(dt):
+    # converts a dd/mm/yyyy string to its ordinal
+    # returns -1 if the date is invalid
+    # the usual zero padded form is checked and converted with integer arithmetic only,
+    # anything else (such as 1/2/2021) goes through datetime like the original validateDate()
+    if len(dt) == 10 and dt[2] == '/' and dt[5] == '/' and dt[0:2].isdigit() and dt[3:5].isdigit() \
+            and dt[6:10].isdigit() and dt.isascii():
+        day = int(dt[0:2])
+        month = int(dt[3:5])
+        year = int(dt[6:10])
+        if year < 1 or month < 1 or month > 12 or day < 1:
+            return -1
+        leap = isLeap(year)
+        if day > daysIn[month] + (month == 2 and leap):
+            return -1
+        before = year - 1
+        return before * 365 + before // 4 - before // 100 + before // 400 + daysBefore[month] \
+            + (month > 2 and leap) + day
+    if dt.count('/') != 2:
+        return -1
+    dt = dt.split('/')
+    try:
+        return datetime.date(int(dt[2]), int(dt[1]), int(dt[0])).toordinal()
+    except (ValueError, OverflowError):
+        return -1
+
+
+@lru_cache(maxsize=cacheSize)
+def monthStart(ordinal):
+    # returns the ordinal of the first day of the month that ordinal is in
+    return ordinal - datetime.date.fromordinal(ordinal).day + 1
+
+
+@lru_cache(maxsize=cacheSize)
+def monthEnd(ordinal):
+    # returns the ordinal of the last day of the month that ordinal is in
+    day = datetime.date.fromordinal(ordinal)
+    if day.month == 12:
+        return datetime.date(day.year + 1, 1, 1).toordinal() - 1
+    return datetime.date(day.year, day.month + 1, 1).toordinal() - 1
+
+
+def ordinalDate(ordinal, format='%d/%m/%Y'):
+    # converts an ordinal back to a date string, dd/mm/yyyy unless another strftime format is given
+    return datetime.date.fromordinal(ordinal).strftime(format)
@@ -0,0 +1,1092 @@
+# core banking functions of the owais banking system
+# this module only defines functions, nothing runs or asks for input when it is imported
+# all data files are read from and written to the current directory
+
+# importing modules
+import datetime
+
+from owaisbank.config import setting
+from owaisbank.journal import readTail
+from owaisbank import journal
+from owaisbank.dates import dateOrdinal, monthEnd, ordinalDate
+from owaisbank.locks import storeLock, lockAccounts, addWatcher
+from owaisbank.logwriter import logWriter
+from owaisbank.metrics import timed
+from owaisbank.render import formats, writeHeading, writePages, writeTable, writeRows
+from owaisbank.storage import repository, resetRepository, createRecordStore, createPartitions, TextRepository
+from owaisbank import records as recordStore
+from owaisbank import columnar
+from owaisbank import partitions
+
+
+# account index
+# maps each id/database file to an in-memory copy of its records so lookups do not rescan the file
+# format: {file: {'ids': {id: line number}, 'records': [[field, field, ...], ...]}}
+# records are the lines split on commas, so ','.join(record) gives back the original line
+# an entry is built the first time a file is used and kept in sync by the base functions
+# the lines are read from the storage backend, see owaisbank.storage
+accountIndex = {}
+
+
+@timed('buildIndex')
+def buildIndex(db):
+    # reads db once and stores its records and id positions in accountIndex
+    # db is the name of an account file, its lines come from the storage backend
+    lines = repository().loadLines(db)
+    ids = {}
+    records = []
+    for lineNo, line in enumerate(lines):
+        # only the first occurrence of an id is used, same as a top-down scan
+        if line[0:5] not in ids:
+            ids[line[0:5]] = lineNo
+        records.append(line.split(','))
+    accountIndex[db] = {'ids': ids, 'records': records}
+    return accountIndex[db]
+
+
+def getIndex(db):
+    # returns the index entry of db, building it if it does not exist yet
+    # storeLock is taken so another thread cannot build it at the same time, and in process mode
+    # so the index is dropped first if another process has changed db
+    with storeLock:
+        if db not in accountIndex:
+            return buildIndex(db)
+        return accountIndex[db]
+
+
+def dropIndex(db):
+    # forgets the index of db, used when a file is changed outside the base functions
+    if db in accountIndex:
+        del accountIndex[db]
+
+
+def filesChanged(changed):
+    # called by storeLock in process mode with the data files another process has changed
+    # their indexes are dropped so they are rebuilt from the files when next used
+    for db in ['userPK.txt', 'adminPK.txt', 'adminDB.txt']:
+        if db in changed:
+            dropIndex(db)
+    # the userDB.txt index includes the journal, entries another process appended to it are applied to the
+    # index instead of building it again, unless the journal was emptied into a new userDB.txt snapshot
+    if 'userDB.txt' in changed:
+        dropIndex('userDB.txt')
+    elif 'journal.txt' in changed:
+        entries = readTail()
+        if entries is None:
+            dropIndex('userDB.txt')
+        elif journal.unfinished != []:
+            # the other process stopped before the rows journaled with its changes were all in their logs,
+            # the index is built again so the storage backend finishes them
+            dropIndex('userDB.txt')
+        elif 'userDB.txt' in accountIndex:
+            index = accountIndex['userDB.txt']
+            for id, column, value in entries:
+                if id in index['ids']:
+                    index['records'][index['ids'][id]][int(column)] = value
+    # backends that keep many accounts in one file
+    if changed & repository().storeFiles():
+        for db in ['userPK.txt', 'userDB.txt', 'adminPK.txt', 'adminDB.txt']:
+            dropIndex(db)
+
+
+addWatcher(filesChanged)
+
+
+def loadIndexes():
+    # builds the index of every account file, called once at startup
+    for db in ['userPK.txt', 'userDB.txt', 'adminPK.txt', 'adminDB.txt']:
+        buildIndex(db)
+
+
+def indexAppend(db, line):
+    # adds a line that was appended to db to its index
+    index = getIndex(db)
+    if line[0:5] not in index['ids']:
+        index['ids'][line[0:5]] = len(index['records'])
+    index['records'].append(line.split(','))
+
+
+def indexRemove(db, lineNo):
+    # removes a line from the index of db and shifts the positions of the lines after it
+    index = getIndex(db)
+    del index['records'][lineNo]
+    ids = {}
+    for position, record in enumerate(index['records']):
+        key = ','.join(record)[0:5]
+        if key not in ids:
+            ids[key] = position
+    index['ids'] = ids
+
+
+@timed('compact')
+def compact():
+    # writes the journaled changes into a new userDB.txt snapshot and empties the journal
+    # backends without a journal have nothing to compact
+    with storeLock:
+        repository().compact()
+
+
+@timed('saveChanges')
+def saveChanges(entries):
+    # makes changes to userDB.txt records durable once they have been made in the index
+    # entries is a list of [id, column, value] lists, all values are strings
+    # returns Successful or an error message, the caller then puts back the old values in the index
+    return repository().saveChanges(entries)
+
+
+@timed('saveWithRows')
+def saveWithRows(entries, transactions, transfers):
+    # makes changes to userDB.txt records durable together with the log rows of the same operation,
+    # see Repository.saveWithRows() in owaisbank.storage
+    return repository().saveWithRows(entries, transactions, transfers)
+
+
+def useRecordStore():
+    # moves the user accounts from userPK.txt and userDB.txt, with the journal applied, into accounts.dat
+    # the text files are left as they are but are no longer used for user accounts
+    # the record store is used from then on unless bank.cfg chooses another backend
+    with storeLock:
+        if recordStore.available():
+            return 'Error: the record store is already in use'
+        status = createRecordStore()
+        if status != 'Successful':
+            return status
+        resetRepository()
+        dropIndex('userPK.txt')
+        dropIndex('userDB.txt')
+    return 'Successful'
+
+
+def usePartitions():
+    # moves the transaction log from transactions.txt into monthly partitions, see owaisbank.partitions
+    # transactions.txt is left as it is but is no longer used
+    # the partitions are used from then on by the text and records backends
+    with storeLock:
+        if partitions.available():
+            return 'Error: the transaction log is already partitioned'
+        if not isinstance(repository(), TextRepository):
+            return 'Error: the transaction log can only be partitioned by the text and records backends'
+        return createPartitions()
+
+
+def useColumnStore():
+    # creates the columnar copy of transactions.txt (see owaisbank.columnar), the first pass of a statement
+    # is then answered with numpy instead of reading every row
+    # the copy is kept in step with transactions.txt from then on
+    with storeLock:
+        if columnar.available():
+            return 'Error: the columnar store is already in use'
+        if not isinstance(repository(), TextRepository):
+            return 'Error: the columnar store can only be used by the text and records backends'
+        if partitions.available():
+            return 'Error: the columnar store is a copy of transactions.txt, which a partitioned log no longer uses'
+        return columnar.exportColumns()
+
+
+@timed('archiveHistory')
+def archiveHistory(cutoff):
+    # moves the months of the transaction log dated before cutoff into compressed archive segments,
+    # see owaisbank.archive, statements still read them
+    # cutoff is a date in the format dd/mm/yyyy, only months whose rows are all dated before it are archived
+    # the transaction log is partitioned first if it is not already
+    # returns Successful or an error message
+    if not validateDate(cutoff):
+        return 'Error: invalid date'
+    with storeLock:
+        if not partitions.available():
+            status = usePartitions()
+            if status != 'Successful':
+                return status
+        status = partitions.archivePartitions(dateOrdinal(cutoff), setting('archive_compression'))
+        if isinstance(status, str):
+            return status
+    return 'Successful'
+
+
+# miscellaneous functions
+@timed('findLine')
+def findLine(db, id):
+    # uses Id database to find what line id is on
+    # returns -1 if id is not found
+    # db is a text file existing in the current directory
+    # id is a 5 digit customer or admin id
+    # all arguments are string
+    return getIndex(db)['ids'].get(id, -1)
+
+
+# validations
+def validateID(id):
+    # id must be a 5 digit decimal string
+    # length check
+    if len(id) != 5:
+        return False
+    # type check
+    try:
+        int(id)
+    except ValueError:
+        return False
+    return True
+
+
+def duplicateCheck(id, db):
+    # duplicate check
+    # id is a 5 digit customer or admin id
+    # db is a text file existing in the current directory
+    # all arguments are string
+    if findLine(db, id) != -1:
+        return False
+    return True
+
+
+def validatePass(passwd):
+    # password must have atleast 8 characters, a number and a symbol
+    # passwd is a string
+    # length check
+    if len(passwd) < 8:
+        return False
+    # format check
+    symbols = '!@#$%^&*()`~-_+={}[]|;:"?/>.,<'
+    numbers = '1234567890'
+    symbolCheck = False
+    for symbol in symbols:
+        for char in passwd:
+            if char == symbol:
+                symbolCheck = True
+    numCheck = False
+    for num in numbers:
+        for char in passwd:
+            if char == num:
+                numCheck = True
+
+    if not (numCheck and symbolCheck):
+        return False
+    return True
+
+
+def validateType(type):
+    # type can only be string current or savings
+    if type != 'savings' and type != 'current':
+        return False
+    return True
+
+
+def validateDate(dt):
+    # dt is a string in the format dd/mm/yyyy
+    # the date is valid if it can be converted to an ordinal, see owaisbank.dates
+    return dateOrdinal(dt) != -1
+
+
+def calculateAge(dob):
+    # no validations as assumption is dob is already validated
+    # dob is a string in the format dd/mm/yyyy
+    # convert dob to the datetime object
+    dob = dob.split('/')
+    dob = datetime.datetime(int(dob[2]), int(dob[1]), int(dob[0]))
+    now = datetime.datetime.now()
+    days = (now - dob).days
+    age = days // 365
+    return str(age)
+
+
+def convertToDateObj(dt):
+    # dt is a string in the form dd/mm/yyyy
+    ordinal = dateOrdinal(dt)
+    if ordinal == -1:
+        return -1
+    return datetime.datetime.fromordinal(ordinal)
+
+
+def validateCol(col, v=0):
+    # column can be the string all or an index
+    # v=0 is user version and v=1 is admin version
+    try:
+        int(col)
+    except ValueError:
+        if col != 'all':
+            return False
+    # if it is a digit
+    if v == 0:
+        if not (0 <= int(col) <= 5):
+            return False
+    elif v == 1:
+        if not (0 <= int(col) <= 2):
+            return False
+    else:
+        return False
+    return True
+
+
+def validateValue(value, col):
+    # ensures that value meets its respective validation
+    # col is an index
+    # all arguments are strings
+    # id
+    if col == '0':
+        if not (validateID(value)):
+            return False
+        # type
+    if col == '2':
+        if not validateType(value):
+            return False
+        # dob
+    if col == '4':
+        if not (validateDate(value)):
+            return False
+    return True
+
+
+def validateBranch(branch):
+    # branch can only be the string 1,2 or 3
+    if not (branch == '1' or branch == '2' or branch == '3'):
+        return False
+    return True
+
+
+# base functions for file manipulation and validation
+# some functions return negative numbers to indicate errors
+# others return strings to indicate status
+
+@timed('createUser')
+def createUser(id, name, passwd, type, balance, dob, address):
+    # creates an entry in userDB.txt
+    # all arguments are strings
+    # id is a 5 digit decimal number
+    # name is a normal string
+    # Password must be at least 8 letters with a number and symbol
+    # type can only be string savings or current
+    # balance is an integer in the form of a string
+    # dob is a date string in the format dd/mm/yyyy
+    # address is normal string
+
+    # validations
+    if not validateID(id):
+        return 'Error: id must be 5 digit decimal number'
+    # the lock is held from the duplicate check until the account is written
+    # so two threads cannot create the same id
+    with storeLock:
+        if not duplicateCheck(id, 'userPK.txt'):
+            return 'Error:duplicate entry, account was NOT created!'
+        if not validateDate(dob):
+            return 'Error:date is in wrong format'
+        # age must be more than 11
+        age = calculateAge(dob)
+        if not (11 <= int(age) <= 122):
+            return 'User must be at least 11 yo to create an account'
+
+        if not validatePass(passwd):
+            return 'Error: Password must be at least 8 letters with a number and symbol'
+        if not validateType(type):
+            return 'Error:type can be only savings or current'
+
+        # creating user
+        arguments = [id, name, type, balance, dob, address]
+        record = ''
+        for arg in arguments:
+            record = record + arg + ','
+        record = record + '\n'
+        status = repository().addAccount('userPK.txt', 'userDB.txt', id + ',' + passwd + '\n', record)
+        if status != 'Successful':
+            return status
+        indexAppend('userDB.txt', record)
+        # creating entry in adminPK database
+        indexAppend('userPK.txt', id + ',' + passwd + '\n')
+    return 'successful'
+
+
+@timed('createAdmin')
+def createAdmin(id, name, passwd, dep):
+    # all arguments are string
+    # id is a 5 digit decimal number
+    # name is a normal string
+    # Password must be at least 8 letters with a number and symbol
+    # dep can only be 1,2 or 3
+
+    # validations
+    if not validateID(id):
+        return 'id must be 5 digit decimal number'
+    # the lock is held from the duplicate check until the account is written
+    # so two threads cannot create the same id
+    with storeLock:
+        if not duplicateCheck(id, 'adminPK.txt'):
+            return 'Error: duplicate entry'
+        if not validatePass(passwd):
+            return 'password must be at least 8 letters with a number and symbol'
+        if not validateBranch(dep):
+            return 'department can only be 1,2,3'
+        # creating user
+        arguments = [id, name, dep]
+        record = ''
+        for arg in arguments:
+            record = record + arg + ','
+        record = record + '\n'
+        status = repository().addAccount('adminPK.txt', 'adminDB.txt', id + ',' + passwd + '\n', record)
+        if status != 'Successful':
+            return status
+        indexAppend('adminDB.txt', record)
+        # creating entry in adminPK database
+        indexAppend('adminPK.txt', id + ',' + passwd + '\n')
+    return 'Successful'
+
+
+@timed('read')
+def read(id, db, column):
+    # retrieves the field value of a certain record from its respective database
+    # all arguments are string
+    # id is a 5 digit decimal number
+    # db can either be the string userDB.txt or adminDB.txt
+    # column is an index
+
+    # output is always a string as it will be used by table()
+    # validate db
+    if not (db == 'userDB.txt' or db == 'adminDB.txt'):
+        return -1
+
+    # determine the id file and version of validateCol to use
+    if db == 'userDB.txt':
+        idfile = 'userPK.txt'
+        v = 0
+    elif db == 'adminDB.txt':
+        idfile = 'adminPK.txt'
+        v = 1
+    # find position of line for id and extract the record from the index
+    # the store stays locked between the two so a delete cannot move the records in between
+    with storeLock:
+        linePos = findLine(idfile, id)
+        if linePos == -1:
+            return -2
+        reqRec = getIndex(db)['records'][linePos]
+    # output the column
+    # column is validated differently for each type of account(admin and user)
+
+    if column == 'all':
+        # copy the fields and remove line break at the end
+        reqRec = list(reqRec)
+        del reqRec[len(reqRec) - 1]
+        return reqRec
+    if validateCol(column, v):
+        # if a specific field is required, output the value
+        return [reqRec[int(column)]]
+    else:
+        return -3
+
+
+@timed('edit')
+def edit(id, column, value):
+    # changes specified field value of a record (admin or user/customer)
+    # all arguments are string
+    # id is a 5 digit decimal number
+    # value is a normal string and criteria depends on the column string
+    # column is an index
+
+    # this function will only be used for the user
+    db = 'userDB.txt'
+    # this file stores user ids and passwords
+    idfile = 'userPK.txt'
+    # the account is locked so the change cannot interleave with another change to it, and the
+    # store is locked so the position of the line cannot move while it is changed
+    with lockAccounts(id), storeLock:
+        return editLocked(id, db, idfile, column, value)
+
+
+def editLocked(id, db, idfile, column, value):
+    # does the work of edit() once its locks are held
+    # find position of line for id
+    linePos = findLine(idfile, id)
+    if linePos == -1:
+        return 'Error: account does not exist\n'
+    # extract the record from the index
+    records = getIndex(db)['records']
+
+    # ensure that id,name,type cannot be changed
+
+    # change the column
+    if validateCol(column, 0) == True:
+        # validateCol allows all but all is not needed
+        if column == 'all':
+            return 'Error: all is not allowed in this context'
+        else:
+            # validate the value
+            if not validateValue(value, column):
+                return 'Error: invalid value'
+
+            # change the value in the indexed record and save the change
+            # the old value is put back if the change cannot be saved
+            old = records[linePos][int(column)]
+            records[linePos][int(column)] = value
+            status = saveChanges([[id, column, value]])
+            if status != 'Successful':
+                records[linePos][int(column)] = old
+                return status
+    else:
+        return 'Error: invalid column specified'
+    return 'Successful'
+
+
+@timed('delete')
+def delete(id, adm=0):
+    # deletes an entry in a database
+    # id is a 5 digit decimal number in the form of string
+    # adm is an integers which can be either 0 or 1
+
+    if adm == 0:
+        db = 'userDB.txt'
+        idfile = 'userPK.txt'
+    elif adm == 1:
+        db = 'adminDB.txt'
+        idfile = 'adminPK.txt'
+    else:
+        return -2
+    with lockAccounts(id), storeLock:
+        return deleteLocked(id, db, idfile)
+
+
+def deleteLocked(id, db, idfile):
+    # does the work of delete() once its locks are held
+    # vaildations
+    if findLine(db, id) == -1:
+        return 'account not found'
+    # get line number
+    line = findLine(idfile, id)
+    # if id doesnt exist, do not execute following line and indicate
+    if line == -1:
+        return -3
+    # delete the specified line from both indexes
+    indexRemove(db, line)
+    indexRemove(idfile, line)
+
+    # remove the account from storage
+    repository().removeAccount(idfile, db, id)
+    return 'Successful'
+
+
+def checkPosting(id, type, value, desc, bal):
+    # validates a single withdrawal or deposit against the current balance of the account
+    # id is a 5 digit decimal number in the form of string
+    # type is the string w for withdrawal or d for deposit
+    # value must be an integer (in the form of string)
+    # desc is string with letter limit of 39 letters
+    # bal is the integer balance the posting will be applied to
+    # returns Successful if the posting is valid, otherwise the error message
+    # checks are made in the same order as the original withdraw() and deposit() so messages stay the same
+    if type == 'w':
+        # id check
+        if findLine('userDB.txt', id) == -1:
+            return 'Error: sender does not exist'
+        # type check on value
+        try:
+            int(value)
+        except ValueError:
+            return 'Error: invalid value'
+        # range check on value(depends on account type)
+        # retrieve account type
+        accType = read(id, 'userDB.txt', '2')[0]
+        if accType == 'savings':
+            maximum = 100
+        else:
+            maximum = 500
+        if int(value) > maximum:
+            result = 'Error: {0} account can only withdraw a maximum {1} dollars'.format(accType, maximum)
+            return result
+        # range check2: ensure value/amount is positive
+        if int(value) < 0:
+            return 'Error: withdrawal amount cannot be negative'
+        # length check on description
+        if len(desc) > 40:
+            return 'Error: description must be less than 40 letters'
+        # prevent balance from reaching negative number
+        if bal < int(value):
+            return 'Error: Insufficient funds'
+    elif type == 'd':
+        # id check
+        if findLine('userDB.txt', id) == -1:
+            return 'Error: receiver does not exist'
+        # type check on value
+        try:
+            int(value)
+        except ValueError:
+            return 'Error: invalid value'
+        # length check on description
+        if len(desc) > 40:
+            return 'Error: description must be less than 40 letters'
+        # range check: ensure value/amount is positive
+        if int(value) < 0:
+            return 'Error: deposit amount cannot be negative'
+    else:
+        return 'Error: transaction type can only be w or d'
+    return 'Successful'
+
+
+@timed('logTransactions')
+def logTransactions(rows, transfers=()):
+    # hands rows to the group commit of owaisbank.logwriter, they are appended to the transactions database
+    # together with the rows of other operations in a single write
+    # rows is a list of [date, id, type, value, desc] lists and transfers a list of [date, id, value, desc]
+    # lists for the transfers database, all values are strings
+    # returns the group to pass to logWriter.wait() before the account locks are released
+    return logWriter.append(rowLines(rows), rowLines(transfers))
+
+
+def rowLines(rows):
+    # returns the lines of the transaction or transfer log for rows of string values
+    lines = []
+    for row in rows:
+        lines.append(','.join(row) + '\n')
+    return lines
+
+
+def post(id, type, value, desc):
+    # applies a single withdrawal or deposit and creates entry in transactions database
+    # all arguments are strings
+    # id is a 5 digit decimal number in the form of string
+    # type is the string w for withdrawal or d for deposit
+    # value must be an integer (in the form of string)
+    # desc is string with letter limit of 39 letters
+
+    # generate the date
+    now = datetime.datetime.now()
+    # set the format to dd/mm/yyyy
+    now = now.strftime('%d/%m/%Y')
+    # the account stays locked from reading the balance until the new balance is written
+    # otherwise a second operation could read the old balance and one of the updates would be lost
+    with lockAccounts(id):
+        # validations
+        if findLine('userDB.txt', id) == -1:
+            return checkPosting(id, type, value, desc, 0)
+        bal = int(read(id, 'userDB.txt', '3')[0])
+        status = checkPosting(id, type, value, desc, bal)
+        if status != 'Successful':
+            return status
+        previous = bal
+        # adjust and rewrite the balance
+        if type == 'w':
+            bal = bal - int(value)
+        else:
+            bal = bal + int(value)
+        status = edit(id, '3', str(bal))
+        if status != 'Successful':
+            return status
+
+        # make the entry in transactions database
+        group = logTransactions([[now, id, type, value, desc]])
+        # the posting is only reported once its row is durable, the account stays locked until then
+        # so the old balance can be put back if the row could not be written
+        status = logWriter.wait(group)
+        if status != 'Successful':
+            edit(id, '3', str(previous))
+        return status
+
+
+@timed('withdraw')
+def withdraw(id, value, desc):
+    # withdraws funds from balance of user and creates entry in transactions database
+    # all arguments are strings
+    # id is a 5 digit decimal number in the form of string
+    # value must be an integer (in the form of string)
+    # desc is string with letter limit of 39 letters
+    return post(id, 'w', value, desc)
+
+
+@timed('deposit')
+def deposit(id, value, desc):
+    # deposit funds to balance of user and creates entry in transactions database
+    # all arguments are strings
+    # id is a 5 digit decimal number in the form of string
+    # value must be an integer (in the form of string)
+    # desc is string with letter limit of 39 letters
+    return post(id, 'd', value, desc)
+
+
+@timed('batchPost')
+def batchPost(postings):
+    # applies many withdrawals and deposits at once
+    # postings is an iterable of (id, type, value, desc) where type is the string w or d
+    # and the other values follow the same rules as withdraw() and deposit()
+    # each posting is validated against the balance left by the postings before it,
+    # invalid postings are skipped and do not stop the rest of the batch
+    # balances are changed in memory, then all balance changes are appended to the journal and
+    # all transaction rows are appended to transactions.txt in one write each
+    # returns a list with the status of each posting in the same order
+
+    now = datetime.datetime.now()
+    # set the format to dd/mm/yyyy
+    now = now.strftime('%d/%m/%Y')
+    # every account in the batch is locked, and the store is locked so no line moves during the batch
+    postings = list(postings)
+    ids = []
+    for posting in postings:
+        ids.append(posting[0])
+    with lockAccounts(*ids), storeLock:
+        records = getIndex('userDB.txt')['records']
+        statuses = []
+        rows = []
+        entries = []
+        # {id: balance before the batch} to put back if the balances cannot be saved
+        before = {}
+        for id, type, value, desc in postings:
+            if findLine('userDB.txt', id) == -1:
+                status = checkPosting(id, type, value, desc, 0)
+                statuses.append(status)
+                continue
+            record = records[findLine('userDB.txt', id)]
+            bal = int(record[3])
+            status = checkPosting(id, type, value, desc, bal)
+            statuses.append(status)
+            if status != 'Successful':
+                continue
+            # change the balance in the indexed record only, the file is written after the loop
+            if id not in before:
+                before[id] = record[3]
+            if type == 'w':
+                record[3] = str(bal - int(value))
+            else:
+                record[3] = str(bal + int(value))
+            rows.append([now, id, type, value, desc])
+            entries.append([id, '3', record[3]])
+
+        # persist the balances and the transaction rows in one write each
+        if rows == []:
+            return statuses
+        status = saveChanges(entries)
+        saved = status == 'Successful'
+        if saved:
+            # the accounts stay locked until the rows are durable, so the balances can be put back if they are not
+            status = logWriter.wait(logTransactions(rows))
+        if status != 'Successful':
+            undo = []
+            for id in before:
+                records[findLine('userDB.txt', id)][3] = before[id]
+                undo.append([id, '3', before[id]])
+            if saved:
+                saveChanges(undo)
+            for position in range(len(statuses)):
+                if statuses[position] == 'Successful':
+                    statuses[position] = status
+        return statuses
+
+
+@timed('transfer')
+def transfer(id, sender, receiver, value, desc):
+    # is used by admin account to transfer funds between 2 user accounts
+    # withdraws funds from balance of user and creates entry in transactions database
+    # all arguments are strings
+    # id,sender,receiver is a 5 digit decimal number in the form of string
+    # value must be an integer (in the form of string)
+    # desc is string with letter limit of 39 letters
+
+    # validations
+    if findLine('adminPK.txt', id) == -1:
+        return 'id not found'
+
+    # validations
+    if findLine('userPK.txt', sender) == -1:
+        return 'Error: sender does not exist'
+    if findLine('userPK.txt', receiver) == -1:
+        return 'Error:receiver does not exist'
+    if len(desc) > 40:
+        return 'description must be less than 40 letters'
+    try:
+        int(value)
+    except ValueError:
+        return 'Error: invalid value'
+    if int(value) < 0:
+        return 'Error: value cannot be negative'
+
+    # generate the date
+    now = datetime.datetime.now()
+    # set the format to dd/mm/yyyy
+    now = now.strftime('%d/%m/%Y')
+    # both accounts are locked for the whole transfer, lockAccounts() takes them in sorted order
+    # so a transfer the other way round at the same time waits instead of deadlocking
+    with lockAccounts(sender, receiver), storeLock:
+        # both legs are validated before anything is written
+        senderBal = int(read(sender, 'userDB.txt', '3')[0])
+        status = checkPosting(sender, 'w', value, desc, senderBal)
+        if status != 'Successful':
+            return status
+        senderBal = senderBal - int(value)
+        # a transfer to the same account deposits into the balance left by the withdrawal
+        if receiver == sender:
+            receiverBal = senderBal
+        else:
+            receiverBal = int(read(receiver, 'userDB.txt', '3')[0])
+        status = checkPosting(receiver, 'd', value, desc, receiverBal)
+        if status != 'Successful':
+            return status
+        receiverBal = receiverBal + int(value)
+
+        # both balances, both transaction rows and the transfer itself are saved together,
+        # so a crash can never apply only some of them
+        records = getIndex('userDB.txt')['records']
+        before = [records[findLine('userDB.txt', sender)][3], records[findLine('userDB.txt', receiver)][3]]
+        records[findLine('userDB.txt', sender)][3] = str(senderBal)
+        records[findLine('userDB.txt', receiver)][3] = str(receiverBal)
+        # rows waiting in the group commit are written first so the logs stay in the order the balances changed
+        logWriter.flush()
+        rows = [[now, sender, 'w', value, desc], [now, receiver, 'd', value, desc]]
+        status = saveWithRows([[sender, '3', str(senderBal)], [receiver, '3', str(receiverBal)]],
+                              rowLines(rows), rowLines([[now, id, value, desc]]))
+        if status != 'Successful':
+            # the receiver is put back first, a transfer to the same account then ends with the sender's old balance
+            records[findLine('userDB.txt', receiver)][3] = before[1]
+            records[findLine('userDB.txt', sender)][3] = before[0]
+            return status
+    return 'Successful'
+
+
+@timed('table')
+def table(heading, args, out=None, format='table', pager=None):
+    # displays args in form of a table
+    # args value is a list with embedded lists
+    # all args must be the same length
+    # heading is a normal string
+    # out is the file the table is written to, the screen if it is not given
+    # format is table, or csv or jsonl to write args[0] as the header and the rest as rows without the heading
+    # pager is called after every page of rows and stops the table if it returns False
+
+    standardLength = len(args[0])
+    for arg in args:
+        if not len(arg) == standardLength:
+            print("All rows must be the same length", file=out)
+            return 0
+    if format != 'table':
+        writeRows(format, args[0], args[1:], out)
+        return
+
+    # find the width of each column(index)
+    # width = largest width in a column
+    # in this case args[0] is used but all args have the same length
+    length = len(args[0])
+    colLens = []  # this will store the width for each column
+    for col in range(0, length):
+        # this loop iterates through the columns
+        largest = 0
+        for arg in args:
+            if len(arg[col]) > largest:
+                largest = len(arg[col])
+        colLens.append(largest)
+
+    drawTable(heading, args, colLens, out, pager)
+
+
+def drawTable(heading, rows, colLens, out=None, pager=None):
+    # draws the heading followed by rows
+    # rows can be any iterable of lists, including a generator, and is drawn a page at a time
+    # colLens is the width of each column
+    # out is the file the table is written to, the screen if it is not given
+    writeHeading(heading, out)
+    drawRows(rows, colLens, out, pager)
+
+
+def drawRows(rows, colLens, out=None, pager=None):
+    # this draws the actual table
+    # words that do not meet the width of their column get extra spaces for the sake of even spacing
+    # rows are written a page at a time, pager is called after every page and stops the table if it returns False
+    writeTable(rows, colLens, out, pager)
+
+
+@timed('changePass')
+def changePass(id, newpass):
+    # changes the password of user account id
+    # all arguments are strings
+    # the old password must be checked by the caller
+    if not validatePass(newpass):
+        return 'Error: new password must have at least 8 characters, a symbol and a number'
+    with lockAccounts(id), storeLock:
+        lineNum = findLine('userPK.txt', id)
+        if lineNum == -1:
+            return 'Error: account does not exist'
+        records = getIndex('userPK.txt')['records']
+        # the old password is put back if the new one cannot be saved
+        old = records[lineNum]
+        records[lineNum] = (id + ',' + newpass + '\n').split(',')
+        status = repository().savePassword('userPK.txt', id)
+        if status != 'Successful':
+            records[lineNum] = old
+            return status
+    return 'Successful'
+
+
+def showUsers(out=None, pager=None):
+    # shows all Users in a database
+    # the lines are written a page at a time, pager is called after every page and stops them if it returns False
+
+    print('\n', file=out)
+    # each record keeps its line break and print() added another one, so the lines are written the same way
+    writePages((','.join(record) + '\n' for record in getIndex('userPK.txt')['records']), out, pager)
+
+
+def statementColumns():
+    # returns the widths of the statement columns before any rows are measured
+    colLens = [len('Date'), len('Transaction type'), len('amount'), len('runningBal'), len('Desc')]
+    colLens[1] = max(colLens[1], len('Balance b/d'))
+    return colLens
+
+
+def measureRows(rows, colLens):
+    # first pass of a statement: widens colLens to fit rows
+    # rows is an iterable of [date, id, type, value, desc\n] lists in date order
+    # returns [change, lowest, highest], the total change and the lowest and highest running balance,
+    # all relative to balance b/d
+    change = 0
+    lowest = 0
+    highest = 0
+    for record in rows:
+        if record[2] == 'w':
+            change = change - int(record[3])
+        elif record[2] == 'd':
+            change = change + int(record[3])
+        lowest = min(lowest, change)
+        highest = max(highest, change)
+        colLens[0] = max(colLens[0], len(record[0]))
+        colLens[1] = max(colLens[1], len(record[2]))
+        colLens[2] = max(colLens[2], len(record[3]))
+        colLens[4] = max(colLens[4], len(record[4]) - 1)
+    return [change, lowest, highest]
+
+
+def drawStatement(id, balbd, rows, colLens, lowest, highest, out=None, pager=None):
+    # second pass of a statement: draws it with the widths measured in the first pass
+    # balbd is the integer balance brought down, rows are the same rows that were measured
+    # out is the file the statement is written to, the screen if it is not given
+    # pager is called after every page of rows and stops the statement if it returns False
+    colLens[2] = max(colLens[2], len(str(balbd)))
+    colLens[3] = max(colLens[3], len(str(balbd + lowest)), len(str(balbd + highest)))
+    header = ['Date', 'Transaction type', 'amount', 'runningBal', 'Desc']
+    drawTable('OWAIS BANK\n' + id + ' statement of accounts', [header], colLens, out)
+    drawRows(runningRows(rows, balbd), colLens, out, pager)
+
+
+def runningRows(rows, balbd):
+    # generator that yields the rows of a statement one at a time
+    # rows is an iterable of [date, id, type, value, desc\n] lists in date order
+    # balbd is the integer balance brought down
+    # each row is [date, w/d, amount, running balance, desc]
+    yield [' ', 'Balance b/d', str(balbd), str(balbd), ' ']
+    previousVal = balbd
+    for record in rows:
+        # record[3] is the value/amount
+        if record[2] == 'w':
+            previousVal = previousVal - int(record[3])
+        elif record[2] == 'd':
+            previousVal = previousVal + int(record[3])
+        # remove \n at the end of description
+        desc = record[4]
+        yield [record[0], record[2], record[3], str(previousVal), desc[:len(desc) - 1]]
+
+
+def balanceBroughtDown(id, sdate):
+    # returns the balance of account id at the start of the ordinal sdate, its current balance less every
+    # transaction made since, which the backend answers from its running totals without reading the rows
+    # the account is locked so no posting can change the balance between the two lookups, and rows still
+    # waiting for their group commit are written first so the balance and the log agree
+    with lockAccounts(id):
+        logWriter.flush()
+        return int(read(id, 'userDB.txt', '3')[0]) - repository().changeSince(id, sdate)
+
+
+@timed('genStat')
+def genStat(id, sdate, edate, out=None, format='table', pager=None):
+    # get the transactions from transactions database
+    # edate and sdate are in the format dd/mm/yyyy
+    # id is a 5 digit decimal number in the form of string
+    # all arguments are string except out, the file the statement is written to (the screen if it is not given)
+    # format is table, or csv or jsonl to write the rows for other programs without measuring them first
+    # pager is called after every page of a table and stops the statement if it returns False
+
+    # validations
+    if findLine('userPK.txt', id) == -1:
+        return 'Error: account does not exist'
+    if not (validateDate(sdate) and validateDate(edate)):
+        return 'Error: invalid dates'
+    if format not in formats:
+        return 'Error: format can only be table, csv or jsonl'
+    # sdate must be larger than edate
+    # the range is compared as ordinals
+    sdate = dateOrdinal(sdate)
+    edate = dateOrdinal(edate)
+    if sdate > edate:
+        print('Error: Start date cannot be larger than End date', file=out)
+        return 0
+
+    # the statement is made in two passes over the transactions of this account in the date range
+    # so no more than one row is held in memory at a time
+    balbd = balanceBroughtDown(id, sdate)
+    if format != 'table':
+        # csv and json lines need no column widths, so the rows are written in a single pass
+        header = ['Date', 'Transaction type', 'amount', 'runningBal', 'Desc']
+        writeRows(format, header, runningRows(repository().iterTransactions(id, sdate, edate), balbd), out)
+        return 'Successful'
+    # first pass: the column widths are measured so the table can be drawn row by row
+    colLens = statementColumns()
+    # the running balance is tracked relative to balance b/d, its lowest and highest values give its widest value
+    summary = repository().summary(id, sdate, edate)
+    if summary is not None:
+        # the backend answers the first pass without handing over every row (see Repository.summary)
+        count, change, lowest, highest, amountWidth, descWidth = summary
+        if count > 0:
+            # dates are always written as dd/mm/yyyy and types as a single letter
+            colLens[0] = max(colLens[0], len('dd/mm/yyyy'))
+            colLens[2] = max(colLens[2], amountWidth)
+            colLens[4] = max(colLens[4], descWidth)
+    else:
+        change, lowest, highest = measureRows(repository().iterTransactions(id, sdate, edate), colLens)
+
+    # second pass: rows are generated with their running balance and drawn as they are produced
+    drawStatement(id, balbd, repository().iterTransactions(id, sdate, edate), colLens, lowest, highest, out, pager)
+    return 'Successful'
+
+
+def summaryRows(id, period, sdate, edate):
+    # returns the totals of account id for each day (period d) or month (period m) with transactions
+    # sdate and edate are date ordinals, months are whole months from the month holding sdate
+    # each row is [period, deposits, withdrawals, number of transactions, closing balance], all strings
+    # the totals come from the rollups of the backend and only the closing balance of the last period
+    # needs a lookup, the earlier ones are worked back from it
+    # the totals and the closing balance are looked up together, see balanceBroughtDown()
+    with lockAccounts(id):
+        logWriter.flush()
+        rows = repository().rollup(id, period, sdate, edate)
+        if rows == []:
+            return []
+        last = rows[len(rows) - 1][0]
+        if period == 'm':
+            last = monthEnd(last)
+        closing = int(read(id, 'userDB.txt', '3')[0]) - repository().changeSince(id, last + 1)
+    result = []
+    for start, deposits, withdrawals, count in reversed(rows):
+        if period == 'm':
+            label = ordinalDate(start, '%m/%Y')
+        else:
+            label = ordinalDate(start)
+        result.append([label, str(deposits), str(withdrawals), str(count), str(closing)])
+        closing = closing - deposits + withdrawals
+    result.reverse()
+    return result
+
+
+@timed('genSummary')
+def genSummary(id, period, sdate, edate, out=None):
+    # displays the daily or monthly totals of an account between two dates as a table
+    # id is a 5 digit decimal number in the form of string
+    # period is the string d for days or m for months
+    # edate and sdate are in the format dd/mm/yyyy
+    # out is the file the table is written to, the screen if it is not given
+    if findLine('userPK.txt', id) == -1:
+        return 'Error: account does not exist'
+    if period != 'd' and period != 'm':
+        return 'Error: period can only be d or m'
+    if not (validateDate(sdate) and validateDate(edate)):
+        return 'Error: invalid dates'
+    sdate = dateOrdinal(sdate)
+    edate = dateOrdinal(edate)
+    if sdate > edate:
+        return 'Error: Start date cannot be larger than End date'
+    header = ['Day', 'Deposits', 'Withdrawals', 'Transactions', 'Closing balance']
+    if period == 'm':
+        header[0] = 'Month'
+    rows = summaryRows(id, period, sdate, edate)
+    if rows == []:
+        print('No transactions in this period', file=out)
+        return 'Successful'
+    table('OWAIS BANK\n' + id + ' account summary', [header] + rows, out)
+    return 'Successful'
@@ -0,0 +1,211 @@
+# write-ahead journal for changes to userDB.txt
+# instead of rewriting userDB.txt on every edit, each change is appended to journal.txt as id,column,value
+# userDB.txt is only rewritten (a snapshot) when the journal reaches journalLimit entries
+# when userDB.txt is loaded the journal is replayed on top of it to recover the latest values
+# changes that must happen together are written between a begin line and a commit line,
+# and a group whose commit line never made it to disk is ignored
+# a group can also hold the log rows written with its changes, as file,offset,row entries giving the log file and
+# the byte offset the row is appended at (see saveWithRows() in owaisbank.storage), a done line follows the group
+# once the rows are in their logs, and the rows of a committed group without one are appended on recovery
+# unless they are already there
+# a line or a group cut off by a crash is removed from the end of the journal when it is read, so the next
+# entry starts on a line of its own and is not taken as part of the unfinished group
+# in process mode the entries other processes append are read from where this process left off (see readTail()),
+# the journal is emptied by replacing it with a new file so other processes can tell it was emptied
+
+# importing modules
+import os
+
+from owaisbank.locks import addWatcher
+
+journalFile = 'journal.txt'
+# number of entries after which the journal is compacted into a new userDB.txt snapshot
+journalLimit = 1000
+# number of entries currently in the journal, None until the journal has been read
+journalSize = None
+# journal.txt open for reading and the number of its bytes this process has read or written
+# the file stays open so its inode cannot be reused by a new journal while this process still uses it
+journalHandle = None
+journalEnd = 0
+# True when another process has written to the journal since this process last read it
+journalStale = False
+# [file, offset, row] entries of the committed groups that are not followed by a done line yet
+unfinished = []
+
+
+def isRow(entry):
+    # returns True for the entry of a log row, its first field is a file name instead of an account id
+    return entry[0].endswith('.txt')
+
+
+def parseJournal(f):
+    # reads the journal lines of f, a journal opened in binary mode
+    # returns [entries, end] where entries is a list of [id, column, value] lists and end is the
+    # byte offset just after the last complete line outside a group or commit line
+    # the rows of committed groups are added to unfinished until a done line is read
+    global unfinished
+    entries = []
+    # entries of a group that has not reached its commit line yet, None outside a group
+    group = None
+    end = 0
+    position = 0
+    for line in f:
+        # a line without a line break was cut off by a crash and is ignored
+        if not line.endswith(b'\n'):
+            break
+        position += len(line)
+        line = line.decode().rstrip('\r\n')
+        if line == 'begin':
+            group = []
+        elif line == 'commit':
+            if group is not None:
+                entries.extend(group)
+                for entry in group:
+                    if isRow(entry):
+                        unfinished.append(entry)
+            group = None
+        elif line == 'done':
+            unfinished = []
+        else:
+            # value is last so it may contain commas
+            entry = line.split(',', 2)
+            if len(entry) != 3:
+                continue
+            if group is None:
+                entries.append(entry)
+            else:
+                group.append(entry)
+        if group is None:
+            end = position
+    return [entries, end]
+
+
+def readJournal():
+    # returns the journal entries as a list of [id, column, value] lists in the order they were made
+    # a missing journal is the same as an empty one
+    global journalSize, journalEnd, journalStale, unfinished
+    closeJournal()
+    journalSize = 0
+    journalEnd = 0
+    journalStale = False
+    unfinished = []
+    entries = readTail()
+    if entries is None:
+        return []
+    return entries
+
+
+def readTail():
+    # returns the entries appended to the journal since this process last read it, or None if the journal
+    # has been emptied or replaced since, in which case it has to be read again with readJournal()
+    global journalHandle, journalSize, journalEnd, journalStale
+    if journalSize is None:
+        return None
+    try:
+        info = os.stat(journalFile)
+    except FileNotFoundError:
+        info = None
+    if info is None:
+        if journalEnd != 0:
+            journalSize = None
+            return None
+        return []
+    if journalHandle is None:
+        journalHandle = open(journalFile, 'rb')
+    if os.fstat(journalHandle.fileno()).st_ino != info.st_ino or info.st_size < journalEnd:
+        journalSize = None
+        return None
+    journalHandle.seek(journalEnd)
+    entries, end = parseJournal(journalHandle)
+    journalEnd += end
+    # anything after the last complete line or group was cut off by a crash, it is removed
+    # so the next append does not join it
+    if info.st_size > journalEnd:
+        with open(journalFile, 'r+b') as f:
+            f.truncate(journalEnd)
+    journalSize += len(entries)
+    journalStale = False
+    return entries
+
+
+def closeJournal():
+    global journalHandle
+    if journalHandle is not None:
+        journalHandle.close()
+        journalHandle = None
+
+
+def catchUp():
+    # brings journalSize and journalEnd up to date before the journal is appended to or counted
+    if journalSize is None or (journalStale and readTail() is None):
+        readJournal()
+
+
+def appendJournal(entries):
+    # appends entries to the journal in one write and forces them to disk before returning
+    # entries is a list of [id, column, value] lists, all values are strings
+    # more than one entry is written as a group so either all of them or none are replayed
+    # the rows of a group are unfinished until finishGroup() is called
+    global journalSize, journalEnd
+    if entries == []:
+        return
+    catchUp()
+    lines = []
+    for entry in entries:
+        lines.append(','.join(entry) + '\n')
+    if len(entries) > 1:
+        lines.insert(0, 'begin\n')
+        lines.append('commit\n')
+    with open(journalFile, 'a') as f:
+        f.write(''.join(lines))
+        f.flush()
+        os.fsync(f.fileno())
+        journalEnd = os.fstat(f.fileno()).st_size
+    journalSize += len(entries)
+    for entry in entries:
+        if isRow(entry):
+            unfinished.append(entry)
+
+
+def finishGroup():
+    # appends a done line once the rows of the groups before it are in their logs
+    # it is not forced to disk, the rows of a group found without it are only appended if they are not there
+    global journalEnd, unfinished
+    catchUp()
+    with open(journalFile, 'a') as f:
+        f.write('done\n')
+        f.flush()
+        journalEnd = os.fstat(f.fileno()).st_size
+    unfinished = []
+
+
+def clearJournal():
+    # empties the journal, only called after its entries are safely in a userDB.txt snapshot
+    # a new empty file replaces it, the open journal is closed first since an open file cannot be replaced everywhere
+    global journalSize, journalEnd, journalStale, unfinished
+    closeJournal()
+    with open(journalFile + '.tmp', 'w') as f:
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(journalFile + '.tmp', journalFile)
+    journalSize = 0
+    journalEnd = 0
+    journalStale = False
+    unfinished = []
+
+
+def journalFull():
+    # returns True when the journal has reached journalLimit entries and should be compacted
+    catchUp()
+    return journalSize >= journalLimit
+
+
+def filesChanged(changed):
+    # called by storeLock in process mode, the entries another process appended to the journal are read
+    # before it is next used
+    global journalStale
+    if 'journal.txt' in changed:
+        journalStale = True
+
+
+addWatcher(filesChanged)
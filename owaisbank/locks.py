@@ -0,0 +1,192 @@
+# locks that let several threads, and optionally several processes, use the engine at the same time
+# every account has its own lock, held across the read-modify-write of its balance
+# so two operations on the same account happen one after the other while different accounts run in parallel
+# storeLock protects the shared files and in-memory indexes while they are appended to or rewritten
+
+# in process mode (see enableProcessLocks()) storeLock also takes an advisory fcntl lock on bank.lock,
+# so sessions in different processes take turns on the data files, and account locks take storeLock too
+# since the balance they protect may be changed by another process
+# bank.lock holds a name,generation line for each watched file, a process that changed a file adds one to its
+# generation before it releases the lock, so the other processes see the change even when the inode, size and
+# modification time of the file are the same (a write in place within one tick of a coarse file system clock)
+
+# importing modules
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # fcntl only exists on unix, process mode is not available elsewhere
+    fcntl = None
+
+lockFile = 'bank.lock'
+# files whose in-memory copies must be dropped when another process changes them
+# (the partitions and archive segments of the transaction log are named by its manifest)
+watchedFiles = ['userPK.txt', 'userDB.txt', 'adminPK.txt', 'adminDB.txt', 'journal.txt', 'transactions.txt',
+                'txindex.txt', 'accounts.dat', os.path.join('txparts', 'manifest.txt')]
+# functions called with the set of changed files after the fcntl lock is taken
+watchers = []
+processMode = False
+
+
+def readGenerations(f):
+    # returns {file: generation} from bank.lock open as f, files that were never changed are left out
+    generations = {}
+    f.seek(0)
+    for line in f.read().splitlines():
+        entry = line.rsplit(',', 1)
+        if len(entry) == 2 and entry[1].isdigit():
+            generations[entry[0]] = int(entry[1])
+    return generations
+
+
+def fileStamps():
+    # returns {file: (inode, size, modification time)} for the watched files, None if a file does not exist
+    stamps = {}
+    for name in watchedFiles:
+        try:
+            info = os.stat(name)
+            stamps[name] = (info.st_ino, info.st_size, info.st_mtime_ns)
+        except FileNotFoundError:
+            stamps[name] = None
+    return stamps
+
+
+def addWatcher(watcher):
+    # registers a function to be told which watched files another process has changed
+    watchers.append(watcher)
+
+
+class StoreLock:
+    # reentrant lock for the shared data files
+    # in process mode the outermost acquire also takes the fcntl lock and compares the watched files and their
+    # generations with how this process left them, and the outermost release adds one to the generation of
+    # every file changed while the lock was held and records how the files are left now
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.depth = 0
+        # thread holding the lock
+        self.owner = None
+        self.file = None
+        # stamps and generations of the watched files when this process last released the lock
+        self.stamps = {}
+        self.generations = {}
+        # stamps of the watched files when the lock was taken, and the files written in place since
+        self.taken = {}
+        self.written = set()
+
+    def acquire(self):
+        self.lock.acquire()
+        self.depth += 1
+        self.owner = threading.get_ident()
+        if self.depth == 1 and processMode:
+            try:
+                self.file = open(lockFile, 'a+')
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+                stamps = fileStamps()
+                generations = readGenerations(self.file)
+                changed = set()
+                for name in watchedFiles:
+                    if self.stamps.get(name, 'unknown') != stamps[name]:
+                        changed.add(name)
+                    elif self.generations.get(name, 0) != generations.get(name, 0):
+                        changed.add(name)
+                self.generations = generations
+                self.taken = stamps
+                self.written = set()
+                for watcher in watchers:
+                    watcher(changed)
+            except BaseException:
+                self.release()
+                raise
+
+    def release(self):
+        if self.depth == 1 and self.file is not None:
+            self.stamps = fileStamps()
+            for name in watchedFiles:
+                if self.stamps[name] != self.taken.get(name):
+                    self.written.add(name)
+            if self.written & set(watchedFiles):
+                for name in self.written & set(watchedFiles):
+                    self.generations[name] = self.generations.get(name, 0) + 1
+                lines = []
+                for name in sorted(self.generations):
+                    lines.append('{0},{1}\n'.format(name, self.generations[name]))
+                # the lock file is opened for appending, so the lines are written from the start once it is emptied
+                self.file.truncate(0)
+                self.file.write(''.join(lines))
+                self.file.flush()
+            self.written = set()
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+            self.file.close()
+            self.file = None
+        self.depth -= 1
+        if self.depth == 0:
+            self.owner = None
+        self.lock.release()
+
+    def held(self):
+        # returns True when the calling thread holds the lock
+        return self.owner == threading.get_ident()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+storeLock = StoreLock()
+# {id: lock}, a lock is created the first time its account is used
+accountLocks = {}
+# protects accountLocks while new locks are added
+registryLock = threading.Lock()
+
+
+def enableProcessLocks():
+    # turns on process mode, used when several processes share the same data files
+    # returns an error message if fcntl is not available on this system
+    global processMode
+    if fcntl is None:
+        return 'Error: process locks need fcntl, which is only available on unix'
+    processMode = True
+    return 'Successful'
+
+
+def fileWritten(name):
+    # records that the holder of storeLock changed the watched file name in place, which its stamp may not show
+    # the generation of the file goes up when storeLock is released, see StoreLock
+    if processMode and storeLock.held():
+        storeLock.written.add(name)
+
+
+def accountLock(id):
+    # returns the lock of account id, creating it if needed
+    # the locks are reentrant so a function holding a lock can call another that takes the same lock
+    with registryLock:
+        if id not in accountLocks:
+            accountLocks[id] = threading.RLock()
+        return accountLocks[id]
+
+
+@contextmanager
+def lockAccounts(*ids):
+    # holds the locks of all ids for the duration of a with block
+    # locks are always taken in sorted order so two threads locking the same accounts cannot deadlock
+    # in process mode storeLock is taken after them, which is the same order used everywhere else
+    locks = []
+    for id in sorted(set(ids)):
+        locks.append(accountLock(id))
+    if processMode:
+        locks.append(storeLock)
+    for lock in locks:
+        lock.acquire()
+    try:
+        yield
+    finally:
+        for lock in reversed(locks):
+            lock.release()
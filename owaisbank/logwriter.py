@@ -0,0 +1,162 @@
+# group commit of the transaction and transfer logs
+# withdraw(), deposit() and batchPost() hand their rows to logWriter instead of appending them themselves
+# (transfer() saves its rows with its balances, see saveWithRows() in owaisbank.storage), rows handed in by many
+# threads at about the same time are written together as one group, that is one append to each log and at most
+# one fsync, and each caller only returns once its group is durable
+# callers keep their accounts locked until then, so a group that could not be written has its balances put back
+# before another operation on the same accounts sees them
+# settings in bank.cfg (see owaisbank.config):
+#   durability       none   the caller does not wait, rows are written in the background and a crash can lose
+#                           the last group
+#                    write  the caller waits until its group has been written to the log files (the default)
+#                    fsync  the caller waits until its group has also been synced to disk
+#   commit_interval  milliseconds a group stays open for more rows before it is written (left out, a group is
+#                    written as soon as a caller waits for it, by that caller)
+#   commit_rows      number of rows that closes a group before the interval has passed, with durability none
+#                    and no interval groups are written every commit_rows rows
+# pending rows are written before statements are read and when the program exits
+
+# importing modules
+import atexit
+import threading
+import time
+
+from owaisbank.config import setting
+from owaisbank.locks import storeLock
+from owaisbank.storage import repository
+
+durabilities = ['none', 'write', 'fsync']
+
+
+def durability():
+    # returns the durability level chosen in bank.cfg
+    level = setting('durability')
+    if level == '':
+        return 'write'
+    if level not in durabilities:
+        raise ValueError('unknown durability: ' + level)
+    return level
+
+
+def commitInterval():
+    # returns the commit interval in seconds, 0 if there is none
+    if setting('commit_interval') == '':
+        return 0
+    return float(setting('commit_interval')) / 1000
+
+
+def commitRows():
+    # returns the number of rows that closes a group, 0 if there is no limit
+    if setting('commit_rows') == '':
+        return 0
+    return int(setting('commit_rows'))
+
+
+class LogWriter:
+    # rows waiting to be written and the groups they are written in
+    # every call to append() joins the open group, groups are numbered from 1 and written in that order
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        # lines of transactions.txt and transfers.txt in the open group, with their line breaks
+        self.transactions = []
+        self.transfers = []
+        self.rows = 0
+        # number of the open group and of the last group written
+        self.group = 1
+        self.written = 0
+        # {group: exception} of the groups that could not be written
+        self.failures = {}
+        self.thread = None
+
+    def background(self):
+        # returns True when groups are written by the writer thread instead of the callers waiting for them
+        return durability() == 'none' or commitInterval() > 0
+
+    def append(self, transactions, transfers=()):
+        # adds rows to the open group and returns the number of the group to pass to wait()
+        with self.condition:
+            self.transactions.extend(transactions)
+            self.transfers.extend(transfers)
+            self.rows += len(transactions) + len(transfers)
+            group = self.group
+            if self.background():
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self.run, daemon=True)
+                    self.thread.start()
+                self.condition.notify_all()
+            return group
+
+    def wait(self, group):
+        # returns Successful once group has been written as the durability setting asks, at once for durability none
+        # returns an error message if the group could not be written
+        if durability() == 'none':
+            return 'Successful'
+        # the writer thread needs storeLock, so a caller holding it writes the group itself
+        if not self.background() or storeLock.held():
+            self.flush()
+        with self.condition:
+            while self.written < group:
+                self.condition.wait()
+            if group in self.failures:
+                return 'Error: the transaction log could not be written: ' + str(self.failures[group])
+        return 'Successful'
+
+    def flush(self):
+        # writes the open group now, in the calling thread, and returns once every earlier group is written too
+        # storeLock is held from taking the group until it is written, so groups reach the logs in order
+        # and a group another thread is writing is finished once storeLock has been taken
+        with self.condition:
+            if self.rows == 0 and self.written == self.group - 1:
+                return
+        with storeLock:
+            with self.condition:
+                # another thread may have written it while this one waited for storeLock
+                if self.rows == 0:
+                    return
+                transactions = self.transactions
+                transfers = self.transfers
+                group = self.group
+                self.transactions = []
+                self.transfers = []
+                self.rows = 0
+                self.group += 1
+            error = None
+            try:
+                if transactions != []:
+                    repository().appendTransactions(transactions)
+                if transfers != []:
+                    repository().appendTransfers(transfers)
+                if durability() == 'fsync':
+                    repository().syncLogs()
+            except Exception as exception:
+                error = exception
+            with self.condition:
+                if error is not None:
+                    self.failures[group] = error
+                self.written = group
+                self.condition.notify_all()
+
+    def run(self):
+        # writer thread, keeps each group open for the commit interval or until it has commit_rows rows
+        while True:
+            with self.condition:
+                while self.rows == 0:
+                    self.condition.wait()
+                deadline = None
+                if commitInterval() > 0 or commitRows() == 0:
+                    deadline = time.monotonic() + commitInterval()
+                while commitRows() == 0 or self.rows < commitRows():
+                    if deadline is None:
+                        self.condition.wait()
+                        continue
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+            self.flush()
+
+
+logWriter = LogWriter()
+# rows still in the open group are written before the program exits
+atexit.register(logWriter.flush)
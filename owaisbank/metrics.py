@@ -0,0 +1,264 @@
+# instrumentation of the banking engine
+# core functions are wrapped with timed() and keep a latency histogram, a call count and an error count each
+# while metrics are enabled, every file the engine opens is wrapped so the opens, bytes read, bytes written
+# and time spent reading and writing are counted against the operation that caused them and the file used
+# the operation is the outermost timed function of the thread, so the findLine() inside a withdraw() is timed
+# as findLine but the file work of both is counted against withdraw
+
+# metrics are off by default, a timed function then costs one extra call and one test of enabled,
+# and files are opened with the builtin open() as usual
+# they are turned on with enableMetrics() or with metrics = on in bank.cfg (see owaisbank.config)
+# the results are read with prometheusText() or logLine(), or written to a file every few seconds by startLogging()
+
+# importing modules
+import builtins
+import functools
+import sys
+import threading
+import time
+
+# upper bounds of the latency histogram buckets in seconds, the last bucket is +Inf
+buckets = [0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+# modules whose calls to open() are counted, the columnar store is left out as numpy writes to its files directly
+ioModules = ['owaisbank.engine', 'owaisbank.storage', 'owaisbank.journal', 'owaisbank.txindex',
+             'owaisbank.records', 'owaisbank.cli', 'owaisbank.partitions', 'owaisbank.archive']
+
+enabled = False
+# {operation: {'buckets': [count per bucket], 'count': calls, 'sum': seconds, 'errors': errors}}
+operations = {}
+# {(operation, file): {'opens': opens, 'read': bytes, 'written': bytes, 'seconds': seconds}}
+files = {}
+# protects operations and files, several threads may update them at once
+metricsLock = threading.Lock()
+# the stack of timed functions running in each thread
+local = threading.local()
+# stops the thread started by startLogging()
+loggingStop = None
+
+
+def enableMetrics():
+    # starts collecting metrics
+    global enabled
+    for name in ioModules:
+        __import__(name)
+        sys.modules[name].open = countedOpen
+    enabled = True
+
+
+def disableMetrics():
+    # stops collecting metrics, what has been collected is kept
+    global enabled
+    enabled = False
+    for name in ioModules:
+        if name in sys.modules and 'open' in vars(sys.modules[name]):
+            del sys.modules[name].open
+
+
+def resetMetrics():
+    # forgets everything collected so far
+    with metricsLock:
+        operations.clear()
+        files.clear()
+
+
+def currentOperation():
+    # returns the name of the outermost timed function running in this thread
+    stack = getattr(local, 'stack', None)
+    if not stack:
+        return 'none'
+    return stack[0]
+
+
+def record(name, seconds, failed):
+    # adds one call of operation name to its histogram
+    with metricsLock:
+        if name not in operations:
+            operations[name] = {'buckets': [0] * (len(buckets) + 1), 'count': 0, 'sum': 0.0, 'errors': 0}
+        entry = operations[name]
+        position = 0
+        while position < len(buckets) and seconds > buckets[position]:
+            position = position + 1
+        entry['buckets'][position] += 1
+        entry['count'] += 1
+        entry['sum'] += seconds
+        if failed:
+            entry['errors'] += 1
+
+
+def countFile(name, opens=0, read=0, written=0, seconds=0.0):
+    # adds to the file counters of name for the current operation
+    key = (currentOperation(), name)
+    with metricsLock:
+        if key not in files:
+            files[key] = {'opens': 0, 'read': 0, 'written': 0, 'seconds': 0.0}
+        entry = files[key]
+        entry['opens'] += opens
+        entry['read'] += read
+        entry['written'] += written
+        entry['seconds'] += seconds
+
+
+def timed(name):
+    # decorator that keeps the metrics of a function under name while metrics are enabled
+    # a call counts as an error if it raises or returns a string starting with Error
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return function(*args, **kwargs)
+            if getattr(local, 'stack', None) is None:
+                local.stack = []
+            local.stack.append(name)
+            failed = True
+            started = time.perf_counter()
+            try:
+                result = function(*args, **kwargs)
+                failed = isinstance(result, str) and result.startswith('Error')
+                return result
+            finally:
+                record(name, time.perf_counter() - started, failed)
+                local.stack.pop()
+        return wrapper
+    return decorate
+
+
+class CountedFile:
+    # wraps a file object and counts what is read from and written to it
+    # sizes are in characters for text files, which is the same as bytes for the ascii data files
+
+    def __init__(self, file, name):
+        self.file = file
+        self.name = name
+
+    def read(self, *args):
+        started = time.perf_counter()
+        data = self.file.read(*args)
+        countFile(self.name, read=len(data), seconds=time.perf_counter() - started)
+        return data
+
+    def readline(self, *args):
+        started = time.perf_counter()
+        line = self.file.readline(*args)
+        countFile(self.name, read=len(line), seconds=time.perf_counter() - started)
+        return line
+
+    def readlines(self, *args):
+        started = time.perf_counter()
+        lines = self.file.readlines(*args)
+        countFile(self.name, read=sum(len(line) for line in lines), seconds=time.perf_counter() - started)
+        return lines
+
+    def __iter__(self):
+        # lines are counted as they are read, the time is counted when the loop ends
+        size = 0
+        started = time.perf_counter()
+        try:
+            for line in self.file:
+                size = size + len(line)
+                yield line
+        finally:
+            countFile(self.name, read=size, seconds=time.perf_counter() - started)
+
+    def write(self, data):
+        started = time.perf_counter()
+        written = self.file.write(data)
+        countFile(self.name, written=len(data), seconds=time.perf_counter() - started)
+        return written
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.file.close()
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+
+def countedOpen(file, *args, **kwargs):
+    # used in place of open() by the modules in ioModules while metrics are enabled
+    started = time.perf_counter()
+    opened = builtins.open(file, *args, **kwargs)
+    countFile(str(file), opens=1, seconds=time.perf_counter() - started)
+    return CountedFile(opened, str(file))
+
+
+def label(value):
+    # escapes a prometheus label value
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def prometheusText():
+    # returns the metrics in the prometheus text exposition format
+    with metricsLock:
+        lines = ['# HELP owaisbank_operation_seconds Time taken by engine operations.',
+                 '# TYPE owaisbank_operation_seconds histogram']
+        for name in sorted(operations):
+            entry = operations[name]
+            total = 0
+            for position, bound in enumerate(buckets + ['+Inf']):
+                total = total + entry['buckets'][position]
+                lines.append('owaisbank_operation_seconds_bucket{operation="%s",le="%s"} %d' % (label(name), bound, total))
+            lines.append('owaisbank_operation_seconds_sum{operation="%s"} %r' % (label(name), entry['sum']))
+            lines.append('owaisbank_operation_seconds_count{operation="%s"} %d' % (label(name), entry['count']))
+        lines.append('# HELP owaisbank_operation_errors_total Engine operations that failed.')
+        lines.append('# TYPE owaisbank_operation_errors_total counter')
+        for name in sorted(operations):
+            lines.append('owaisbank_operation_errors_total{operation="%s"} %d' % (label(name), operations[name]['errors']))
+        counters = [('opens', 'owaisbank_file_opens_total', 'Files opened.', '%d'),
+                    ('read', 'owaisbank_file_read_bytes_total', 'Bytes read from files.', '%d'),
+                    ('written', 'owaisbank_file_written_bytes_total', 'Bytes written to files.', '%d'),
+                    ('seconds', 'owaisbank_file_seconds_total', 'Time spent opening, reading and writing files.', '%r')]
+        for key, metric, help, format in counters:
+            lines.append('# HELP ' + metric + ' ' + help)
+            lines.append('# TYPE ' + metric + ' counter')
+            for operation, name in sorted(files):
+                lines.append(('%s{operation="%s",file="%s"} ' + format)
+                             % (metric, label(operation), label(name), files[(operation, name)][key]))
+    return '\n'.join(lines) + '\n'
+
+
+def logLine():
+    # returns a one line summary: calls, mean milliseconds and bytes read/written of each operation
+    with metricsLock:
+        read = {}
+        written = {}
+        for (operation, name), entry in files.items():
+            read[operation] = read.get(operation, 0) + entry['read']
+            written[operation] = written.get(operation, 0) + entry['written']
+        parts = []
+        for name in sorted(operations):
+            entry = operations[name]
+            parts.append('%s=%d/%.3fms/r%d/w%d' % (name, entry['count'], entry['sum'] * 1000 / max(1, entry['count']),
+                                                  read.get(name, 0), written.get(name, 0)))
+    return time.strftime('%Y-%m-%d %H:%M:%S') + ' metrics ' + ' '.join(parts)
+
+
+def startLogging(interval, out=None):
+    # writes logLine() to out (standard error if it is not given) every interval seconds from a daemon thread
+    global loggingStop
+    stopLogging()
+    loggingStop = threading.Event()
+
+    def run(stop):
+        while not stop.wait(interval):
+            print(logLine(), file=out or sys.stderr, flush=True)
+
+    threading.Thread(target=run, args=(loggingStop,), daemon=True).start()
+
+
+def stopLogging():
+    # stops the thread started by startLogging()
+    global loggingStop
+    if loggingStop is not None:
+        loggingStop.set()
+        loggingStop = None
+
+
+def configureMetrics():
+    # turns metrics and the periodic log line on if bank.cfg asks for them
+    from owaisbank.config import setting
+    if setting('metrics') in ['on', 'true', 'yes', '1']:
+        enableMetrics()
+        if setting('metrics_interval') != '':
+            startLogging(float(setting('metrics_interval')))
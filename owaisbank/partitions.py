@@ -0,0 +1,594 @@
+# monthly partitions of the transaction log
+# instead of one transactions.txt holding all history, the rows of each month are kept in their own file in the
+# txparts folder (txparts/2021-12.txt holds the rows dated in december 2021), so a statement for a short range
+# only opens the partitions that overlap it
+# txparts/manifest.txt has a name,first ordinal,last ordinal,rows,segment,hot line for each partition, giving the
+# dates of its first and last rows, the number of rows in it, the archive segment holding its older rows ('' if
+# it has not been archived, see owaisbank.archive) and whether txparts/name.txt holds rows (1) or not (0)
+# the manifest is only rewritten when the dates of a partition change, a partition is added or a month is
+# archived, so the number of rows it gives is brought up to date then and can be behind between two rewrites
+# the partitions are used once they have been created with usePartitions() in the engine, transactions.txt is
+# then left as it is but is no longer used
+# every partition that has been read has an index in memory (see PartitionIndex) of where the rows of each account
+# are, so a statement only reads the rows of its account, and balances, summaries and the first pass of a
+# statement come from the changes and widths in the index without reading any row
+# the index also keeps the deposits and withdrawals of each account in the partition as sums, so the change of
+# an account since a date is a lookup in each partition after it, the indexes are built again when a partition
+# or its segment changes
+
+# importing modules
+import bisect
+import datetime
+import os
+from array import array
+from contextlib import ExitStack
+from itertools import accumulate
+
+from owaisbank.config import setting
+from owaisbank.dates import dateOrdinal, ordinalDate, monthStart, monthEnd
+from owaisbank.locks import storeLock, addWatcher
+from owaisbank.txindex import rowChange
+from owaisbank import archive
+from owaisbank import rollups
+
+partitionFolder = 'txparts'
+manifestFile = os.path.join(partitionFolder, 'manifest.txt')
+# rows appended to an index after it was sorted are sorted in once there are more than this many of them,
+# or more than a quarter of the sorted rows
+tailLimit = 1024
+
+# {name: [first ordinal, last ordinal, rows, segment, hot]}, None until the manifest is read
+manifest = None
+# False when the manifest has been written since it was last synced to disk
+manifestSynced = True
+# {name: PartitionIndex} of the partitions that have been read
+indexes = {}
+# {id: number} of every account seen in a partition, the indexes store the number instead of the id
+accountNumbers = {}
+# {name: file object} of the partitions open for appending
+openFiles = {}
+
+
+def available():
+    # returns True when the partitions have been created and hold the transaction log
+    return os.path.exists(manifestFile)
+
+
+def partitionName(ordinal):
+    # returns the name of the partition holding the rows dated on the ordinal
+    return ordinalDate(ordinal, '%Y-%m')
+
+
+def partitionPath(name):
+    return os.path.join(partitionFolder, name + '.txt')
+
+
+def rowPartition(line):
+    # returns the name of the partition a row of transactions.txt is appended to and the ordinal of its date,
+    # rows without a valid date go to the partition of the current month
+    ordinal = dateOrdinal(line.split(',')[0])
+    if ordinal == -1:
+        ordinal = datetime.date.today().toordinal()
+    return [partitionName(ordinal), ordinal]
+
+
+def partitionFile(name):
+    # returns partition name open for appending, it stays open until the partition is archived
+    if name not in openFiles:
+        openFiles[name] = open(partitionPath(name), 'a')
+    return openFiles[name]
+
+
+def closeFiles():
+    # closes the partitions open for appending
+    global openFiles
+    for f in openFiles.values():
+        f.close()
+    openFiles = {}
+
+
+def syncFiles():
+    # syncs the partitions open for appending to disk, and the manifest if it was written since it was last synced
+    for f in openFiles.values():
+        os.fsync(f.fileno())
+    if manifest is not None and not manifestSynced:
+        writeManifest(True)
+
+
+def loadManifest():
+    # reads manifest.txt into memory
+    # manifests written before there was an archive only have the first four fields
+    global manifest, manifestSynced
+    manifest = {}
+    manifestSynced = True
+    if not os.path.exists(manifestFile):
+        return manifest
+    with open(manifestFile, 'r') as f:
+        for line in f:
+            if not line.endswith('\n'):
+                break
+            entry = line[:-1].split(',')
+            if len(entry) < 6:
+                entry = entry[0:4] + ['', '1']
+            manifest[entry[0]] = [int(entry[1]), int(entry[2]), int(entry[3]), entry[4], int(entry[5])]
+    # a partition left behind by a crash after its month was archived is not part of the log
+    closeFiles()
+    for name in manifest:
+        if manifest[name][4] == 0 and os.path.exists(partitionPath(name)):
+            os.remove(partitionPath(name))
+    return manifest
+
+
+def writeManifest(durable=False):
+    # rewrites manifest.txt from memory, through a temporary file so it is never left half written
+    # durable also syncs it to disk, used before the files it no longer names are deleted
+    global manifestSynced
+    lines = []
+    for name in sorted(manifest):
+        first, last, rows, segment, hot = manifest[name]
+        lines.append('{0},{1},{2},{3},{4},{5}\n'.format(name, first, last, rows, segment, hot))
+    with open(manifestFile + '.tmp', 'w') as f:
+        f.write(''.join(lines))
+        if durable:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(manifestFile + '.tmp', manifestFile)
+    manifestSynced = durable
+
+
+def filesChanged(changed):
+    # called by storeLock in process mode, the manifest is read again if another process changed it
+    # the indexes are kept, each one is checked against the files of its partition before it is used
+    global manifest
+    if manifestFile in changed:
+        manifest = None
+
+
+addWatcher(filesChanged)
+
+
+def fileStamp(path):
+    # returns (inode, size, modification time) of path, None if it does not exist
+    try:
+        info = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (info.st_ino, info.st_size, info.st_mtime_ns)
+
+
+def accountNumber(id):
+    # returns the number of account id in the indexes, giving it one the first time
+    if id not in accountNumbers:
+        accountNumbers[id] = len(accountNumbers)
+    return accountNumbers[id]
+
+
+class PartitionIndex:
+    # per-account index of the rows of one partition, like the transaction index (owaisbank.txindex)
+    # the rows are kept in flat arrays instead of arrays for each account, as most accounts only have a few rows
+    # in a month: each row has a key (the account number shifted left 32 bits plus the date ordinal), a position,
+    # its signed amount (change) and the widths of its amount and description
+    # the first sortedRows rows are sorted by key, rows indexed since then are listed by account number in
+    # tailRows until they are sorted in
+    # depositSums and withdrawalSums hold the deposits and withdrawals of the sorted rows before each of them,
+    # as the rows of an account are next to each other its totals are the difference of two sums
+    # a position below segmentSize is an offset in the rows of the archive segment, a larger one is segmentSize
+    # plus an offset in txparts/name.txt
+
+    def __init__(self, segmentStamp):
+        # stamp of the archive segment the index was built from, see fileStamp()
+        self.segmentStamp = segmentStamp
+        self.segmentSize = 0
+        # inode of txparts/name.txt and the number of its bytes in the index
+        self.hotInode = None
+        self.covered = 0
+        self.keys = array('q')
+        self.positions = array('q')
+        # changes that do not fit in 64 bits are kept in a list instead
+        self.changes = array('q')
+        self.amountWidths = array('H')
+        self.descWidths = array('H')
+        self.sortedRows = 0
+        self.depositSums = array('q', [0])
+        self.withdrawalSums = array('q', [0])
+        # {account number: [row, ...]} of the rows after sortedRows
+        self.tailRows = {}
+
+    def addLine(self, line, position):
+        # indexes a complete row of the partition given as a byte string, rows without a valid date are skipped
+        row = line.decode().replace('\r\n', '\n').split(',')
+        if len(row) < 5:
+            return
+        ordinal = dateOrdinal(row[0])
+        if ordinal == -1:
+            return
+        number = accountNumber(row[1])
+        self.keys.append(number << 32 | ordinal)
+        self.positions.append(position)
+        change = rowChange(row[2], row[3])
+        try:
+            self.changes.append(change)
+        except OverflowError:
+            self.changes = list(self.changes)
+            self.changes.append(change)
+        self.amountWidths.append(min(len(row[3]), 65535))
+        self.descWidths.append(min(len(row[4]) - 1, 65535))
+        if number not in self.tailRows:
+            self.tailRows[number] = []
+        self.tailRows[number].append(len(self.keys) - 1)
+
+    def sortRows(self):
+        # sorts every row by key, rows with the same key keep the order they were indexed in
+        order = sorted(range(len(self.keys)), key=self.keys.__getitem__)
+        self.keys = array('q', [self.keys[row] for row in order])
+        self.positions = array('q', [self.positions[row] for row in order])
+        changes = [self.changes[row] for row in order]
+        try:
+            self.changes = array('q', changes)
+        except OverflowError:
+            self.changes = changes
+        self.amountWidths = array('H', [self.amountWidths[row] for row in order])
+        self.descWidths = array('H', [self.descWidths[row] for row in order])
+        self.sortedRows = len(self.keys)
+        self.tailRows = {}
+        deposits = list(accumulate((max(change, 0) for change in changes), initial=0))
+        withdrawals = list(accumulate((max(-change, 0) for change in changes), initial=0))
+        try:
+            self.depositSums = array('q', deposits)
+            self.withdrawalSums = array('q', withdrawals)
+        except OverflowError:
+            self.depositSums = deposits
+            self.withdrawalSums = withdrawals
+
+    def sortedRange(self, number, sdate, edate):
+        # returns [low, high], the sorted rows of account number dated between the ordinals sdate and edate
+        # are the rows from low up to but not including high
+        low = bisect.bisect_left(self.keys, number << 32 | max(sdate, 0), 0, self.sortedRows)
+        high = bisect.bisect_right(self.keys, number << 32 | edate, low, self.sortedRows)
+        return [low, high]
+
+    def select(self, id, sdate, edate):
+        # returns the rows of account id dated between the ordinals sdate and edate inclusive, in date order
+        # and in the order they were logged for the same date
+        if id not in accountNumbers:
+            return []
+        number = accountNumbers[id]
+        low, high = self.sortedRange(number, sdate, edate)
+        rows = list(range(low, high))
+        tail = []
+        for row in self.tailRows.get(number, []):
+            if sdate <= self.keys[row] & 0xffffffff <= edate:
+                tail.append(row)
+        if tail != []:
+            # sorted rows were logged before the tail, so a stable sort keeps the order rows were logged in
+            rows = sorted(rows + tail, key=self.keys.__getitem__)
+        return rows
+
+    def ordinal(self, row):
+        return self.keys[row] & 0xffffffff
+
+    def totals(self, id, sdate, edate):
+        # returns [deposits, withdrawals, count] of the rows of account id dated between the ordinals sdate and
+        # edate inclusive, only the rows indexed since the last sort are added one at a time
+        if id not in accountNumbers:
+            return [0, 0, 0]
+        number = accountNumbers[id]
+        low, high = self.sortedRange(number, sdate, edate)
+        deposits = self.depositSums[high] - self.depositSums[low]
+        withdrawals = self.withdrawalSums[high] - self.withdrawalSums[low]
+        count = high - low
+        for row in self.tailRows.get(number, []):
+            if sdate <= self.keys[row] & 0xffffffff <= edate:
+                change = self.changes[row]
+                if change > 0:
+                    deposits += change
+                elif change < 0:
+                    withdrawals -= change
+                count += 1
+        return [deposits, withdrawals, count]
+
+
+def partitionIndex(name):
+    # returns the index of partition name brought up to date with its files, building it the first time
+    # the index is built again if the partition was archived since, rows appended to txparts/name.txt
+    # by this process or another one are read from where the index left off
+    # the caller holds storeLock
+    if manifest is None:
+        loadManifest()
+    first, last, rows, segment, hot = manifest[name]
+    segmentStamp = None
+    if segment != '':
+        segmentStamp = fileStamp(archive.segmentPath(segment))
+    hotInfo = None
+    if hot == 1 and os.path.exists(partitionPath(name)):
+        hotInfo = os.stat(partitionPath(name))
+    index = indexes.get(name)
+    if index is not None:
+        valid = index.segmentStamp == segmentStamp
+        if hotInfo is None:
+            valid = valid and index.covered == 0
+        elif index.hotInode is not None:
+            valid = valid and index.hotInode == hotInfo.st_ino and hotInfo.st_size >= index.covered
+        if not valid:
+            index = None
+    if index is None:
+        index = PartitionIndex(segmentStamp)
+        if segment != '':
+            for line in archive.readSegment(segment):
+                index.addLine(line, index.segmentSize)
+                index.segmentSize += len(line)
+        indexes[name] = index
+    if hotInfo is not None and hotInfo.st_size > index.covered:
+        index.hotInode = hotInfo.st_ino
+        with open(partitionPath(name), 'rb') as f:
+            f.seek(index.covered)
+            for line in f:
+                # an unfinished last row is left for the next time, same as the transaction index
+                if not line.endswith(b'\n'):
+                    break
+                index.addLine(line, index.segmentSize + index.covered)
+                index.covered += len(line)
+    if len(index.keys) - index.sortedRows > max(tailLimit, index.sortedRows // 4):
+        index.sortRows()
+    return index
+
+
+def appendRows(lines):
+    # appends rows to the partitions of their dates, one write for each partition
+    # lines are the rows of transactions.txt with their line breaks, see rowPartition()
+    # the caller holds storeLock
+    # the first rows of a new month archive the months the retention policy no longer keeps
+    if manifest is None:
+        loadManifest()
+    newMonth = False
+    changed = False
+    groups = {}
+    for line in lines:
+        name, ordinal = rowPartition(line)
+        if name not in groups:
+            groups[name] = []
+        groups[name].append(line)
+        # the manifest covers the row before it is written, so a crash in between can only make
+        # a statement open a partition it did not need
+        if name not in manifest:
+            manifest[name] = [ordinal, ordinal, 0, '', 1]
+            newMonth = True
+        entry = manifest[name]
+        # rows dated in a month that was archived start a new partition next to its segment
+        if entry[2] == 0 or ordinal < entry[0] or ordinal > entry[1] or entry[4] == 0:
+            changed = True
+        entry[0] = min(entry[0], ordinal)
+        entry[1] = max(entry[1], ordinal)
+        entry[2] += 1
+        entry[4] = 1
+    if changed:
+        writeManifest()
+    for name in groups:
+        f = partitionFile(name)
+        f.write(''.join(groups[name]))
+        f.flush()
+    if newMonth and retentionCutoff() is not None:
+        archivePartitions(retentionCutoff(), setting('archive_compression'))
+
+
+def overlapping(sdate, edate):
+    # returns the names of the partitions with rows dated between the ordinals sdate and edate, oldest first
+    # held so the manifest is read again first if another process has changed it
+    with storeLock:
+        if manifest is None:
+            loadManifest()
+        names = []
+        for name in sorted(manifest):
+            first, last, rows, segment, hot = manifest[name]
+            if first <= edate and last >= sdate:
+                names.append(name)
+        return names
+
+
+def partitionLines(name):
+    # generator of the complete rows of a partition as byte strings with their line breaks,
+    # the rows of its archive segment first, then those of txparts/name.txt
+    first, last, rows, segment, hot = manifest[name]
+    if segment != '':
+        yield from archive.readSegment(segment)
+    if hot == 0 or not os.path.exists(partitionPath(name)):
+        return
+    with open(partitionPath(name), 'rb') as f:
+        for line in f:
+            # an unfinished last row is skipped, same as the transaction index
+            if not line.endswith(b'\n'):
+                break
+            yield line
+
+
+def readPartition(name):
+    # generator of the complete rows of a partition split like readlines().split(',')
+    for line in partitionLines(name):
+        row = line.decode().replace('\r\n', '\n').split(',')
+        if len(row) >= 5:
+            yield row
+
+
+def readRows(name, segment, segmentSize, positions):
+    # generator of the rows of partition name at positions of its index, split like readPartition()
+    # the segment and txparts/name.txt are each opened the first time one of their rows is needed
+    segmentFile = None
+    hotFile = None
+    with ExitStack() as files:
+        for position in positions:
+            if position < segmentSize:
+                if segmentFile is None:
+                    segmentFile = files.enter_context(archive.openSegment(segment))
+                f = segmentFile
+                f.seek(position)
+            else:
+                if hotFile is None:
+                    hotFile = files.enter_context(open(partitionPath(name), 'rb'))
+                f = hotFile
+                f.seek(position - segmentSize)
+            yield f.readline().decode().replace('\r\n', '\n').split(',')
+
+
+def iterRows(id, sdate, edate):
+    # generator of the rows of account id dated between the ordinals sdate and edate inclusive, in date order
+    # only the rows of the account are read, at the positions the index of each partition gives
+    for name in overlapping(sdate, edate):
+        with storeLock:
+            index = partitionIndex(name)
+            positions = [index.positions[row] for row in index.select(id, sdate, edate)]
+            segment = manifest[name][3]
+            segmentSize = index.segmentSize
+        if positions != []:
+            yield from readRows(name, segment, segmentSize, positions)
+
+
+def scanRows(sdate, edate):
+    # generator of the rows of every account dated between the ordinals sdate and edate inclusive,
+    # partition by partition in the order they were logged
+    for name in overlapping(sdate, edate):
+        for row in readPartition(name):
+            if sdate <= dateOrdinal(row[0]) <= edate:
+                yield row
+
+
+def changeSince(id, sdate):
+    # returns the total change of account id made by its rows dated on or after the ordinal sdate
+    # the totals of the account in each partition come from the sums in its index, no row is read
+    change = 0
+    with storeLock:
+        for name in overlapping(sdate, datetime.date.max.toordinal()):
+            deposits, withdrawals, count = partitionIndex(name).totals(id, sdate, datetime.date.max.toordinal())
+            change += deposits - withdrawals
+        return change
+
+
+def rollup(id, period, sdate, edate):
+    # returns the daily or monthly totals of account id, see Repository.rollup() in owaisbank.storage
+    # a partition holds one month, so the total of a month is the totals of the account in the index of its partition
+    # and the daily totals of each partition are worked out on their own
+    if period == 'm':
+        sdate = monthStart(sdate)
+        edate = monthEnd(edate)
+    rows = []
+    with storeLock:
+        for name in overlapping(sdate, edate):
+            index = partitionIndex(name)
+            if period == 'm':
+                deposits, withdrawals, count = index.totals(id, sdate, edate)
+                if count > 0:
+                    rows.append([monthStart(manifest[name][0]), deposits, withdrawals, count])
+                continue
+            selected = index.select(id, sdate, edate)
+            dates = [index.ordinal(row) for row in selected]
+            running = list(accumulate(index.changes[row] for row in selected))
+            rows.extend(rollups.dayTotals(dates, running, sdate, edate))
+    return rows
+
+
+def summary(id, sdate, edate):
+    # returns [count, change, lowest, highest, widest amount, widest description] of the rows of iterRows(),
+    # as described in owaisbank.columnar.rangeSummary(), from the indexes without reading any row
+    count = 0
+    change = 0
+    lowest = 0
+    highest = 0
+    amountWidth = 0
+    descWidth = 0
+    with storeLock:
+        for name in overlapping(sdate, edate):
+            index = partitionIndex(name)
+            for row in index.select(id, sdate, edate):
+                change += index.changes[row]
+                lowest = min(lowest, change)
+                highest = max(highest, change)
+                amountWidth = max(amountWidth, index.amountWidths[row])
+                descWidth = max(descWidth, index.descWidths[row])
+                count += 1
+    return [count, change, lowest, highest, amountWidth, descWidth]
+
+
+def createPartitions(lines):
+    # writes rows of transactions.txt into new partitions and creates the manifest
+    # lines is an iterable of the rows with their line breaks, such as the open transactions.txt
+    global manifest, indexes
+    if not os.path.isdir(partitionFolder):
+        os.mkdir(partitionFolder)
+    manifest = {}
+    indexes = {}
+    closeFiles()
+    # each row is written as it is read, so the log is never held in memory
+    files = {}
+    try:
+        for line in lines:
+            # an unfinished last row and rows without a date are left out, same as the transaction index
+            row = line.split(',')
+            if not line.endswith('\n') or len(row) < 5 or dateOrdinal(row[0]) == -1:
+                continue
+            ordinal = dateOrdinal(row[0])
+            name = partitionName(ordinal)
+            if name not in files:
+                files[name] = open(partitionPath(name), 'w')
+                manifest[name] = [ordinal, ordinal, 0, '', 1]
+            files[name].write(line)
+            manifest[name][0] = min(manifest[name][0], ordinal)
+            manifest[name][1] = max(manifest[name][1], ordinal)
+            manifest[name][2] += 1
+    finally:
+        for f in files.values():
+            f.close()
+    # the manifest is written last, the partitions are not used until it exists
+    writeManifest()
+    return 'Successful'
+
+
+def retentionCutoff():
+    # returns the ordinal of the first day of the oldest month kept in the partitions by the retention_months
+    # setting, or None when months are only archived by archiveHistory() in the engine
+    keep = setting('retention_months')
+    if not keep.isdigit():
+        return None
+    today = datetime.date.today()
+    months = today.year * 12 + today.month - 1 - int(keep)
+    return datetime.date(months // 12, months % 12 + 1, 1).toordinal()
+
+
+def archivePartitions(cutoff, compression):
+    # moves the partitions whose rows are all dated before the ordinal cutoff into compressed archive segments
+    # compression is gzip or lzma
+    # returns the number of months archived, or an error message
+    global manifest
+    if compression not in archive.compressions:
+        return 'Error: unknown archive compression ' + compression
+    with storeLock:
+        if manifest is None:
+            loadManifest()
+        replaced = []
+        for name in sorted(manifest):
+            first, last, rows, segment, hot = manifest[name]
+            if hot == 0 or last >= cutoff:
+                continue
+            # rows added to a month that was already archived are joined with the segment in a new one,
+            # the manifest names the old segment until the new one is complete
+            newSegment = archive.segmentName(name, compression, segment)
+            archive.writeSegment(newSegment, list(partitionLines(name)))
+            manifest[name][3] = newSegment
+            manifest[name][4] = 0
+            replaced.append([name, segment, newSegment])
+            # the positions of the index are no longer those of the files, it is built again when next used
+            indexes.pop(name, None)
+        if replaced == []:
+            return 0
+        # the files are only deleted once the manifest naming the segments is on disk,
+        # if it cannot be written the manifest on disk still names the old files and is read again
+        try:
+            writeManifest(True)
+        except BaseException:
+            manifest = None
+            raise
+        closeFiles()
+        for name, segment, newSegment in replaced:
+            if os.path.exists(partitionPath(name)):
+                os.remove(partitionPath(name))
+            if segment != '':
+                archive.removeSegment(segment)
+        return len(replaced)
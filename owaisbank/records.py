@@ -0,0 +1,230 @@
+# unified store for user accounts
+# instead of a password line in userPK.txt and a profile line at the same line number in userDB.txt,
+# each account is one fixed-width slot in accounts.dat holding both, so reading or changing an account
+# is one seek and one write of its own slot, and deleting an account does not move any other account
+# a slot is slotSize bytes: a status byte (2 in use, 0 free), the balance right-aligned in balanceSize bytes,
+# then the userPK.txt line and the userDB.txt line of the account (with an empty balance field), each preceded
+# by its length as 3 digits, padded with spaces and ending in a line break
+# because the balance always sits at the same place in the slot, a balance change is written in place through
+# mmap and only touches the page holding that slot
+# slots written before the balance had its own place have the status byte 1 and the balance in the userDB.txt
+# line, they are converted the next time the whole account is written
+# the store is used once it has been created with useRecordStore() in the engine
+# admin accounts stay in adminPK.txt and adminDB.txt
+
+# importing modules
+import mmap
+import os
+
+from owaisbank.locks import addWatcher, fileWritten
+
+recordFile = 'accounts.dat'
+slotSize = 512
+balanceSize = 20
+
+# {id: slot number} of the accounts in use, None until the store is read
+slots = None
+# slot numbers of deleted accounts that can be reused
+freeSlots = []
+# ids of the accounts whose slot has its own balance field
+balanceSlots = set()
+# accounts.dat mapped into memory for balance updates, and the size of the file when it was mapped
+mapped = None
+mappedSize = 0
+
+
+def available():
+    # returns True when accounts.dat exists and holds the user accounts
+    return os.path.exists(recordFile)
+
+
+def encodeSlot(pkLine, dbLine):
+    # builds the bytes of a slot from the userPK.txt and userDB.txt lines of an account
+    # lines are given without their line breaks
+    # returns None if the account does not fit in a slot
+    fields = dbLine.split(',')
+    balance = fields[3].encode()
+    fields[3] = ''
+    pk = pkLine.encode()
+    db = ','.join(fields).encode()
+    slot = b'2' + balance.rjust(balanceSize) + b'%03d' % len(pk) + pk + b'%03d' % len(db) + db
+    if len(balance) > balanceSize or len(pk) > 999 or len(db) > 999 or len(slot) > slotSize - 1:
+        return None
+    return slot + b' ' * (slotSize - 1 - len(slot)) + b'\n'
+
+
+def decodeSlot(slot):
+    # returns the userPK.txt and userDB.txt lines of a slot in use, without line breaks
+    start = 1
+    if slot[0:1] == b'2':
+        start = 1 + balanceSize
+    pkLen = int(slot[start:start + 3])
+    pk = slot[start + 3:start + 3 + pkLen]
+    dbLen = int(slot[start + 3 + pkLen:start + 6 + pkLen])
+    db = slot[start + 6 + pkLen:start + 6 + pkLen + dbLen].decode()
+    if slot[0:1] == b'2':
+        # put the balance back in its place in the userDB.txt line
+        fields = db.split(',')
+        fields[3] = slot[1:1 + balanceSize].decode().strip()
+        db = ','.join(fields)
+    return pk.decode(), db
+
+
+def fits(pkLine, dbLine):
+    # returns True if an account with these lines fits in a slot
+    return encodeSlot(pkLine, dbLine) is not None
+
+
+def loadRecords():
+    # reads every slot of accounts.dat
+    # returns a list of [userPK.txt line, userDB.txt line] of the accounts in use, in slot order
+    global slots, freeSlots, balanceSlots
+    slots = {}
+    freeSlots = []
+    balanceSlots = set()
+    accounts = []
+    with open(recordFile, 'rb') as f:
+        slotNo = 0
+        while True:
+            slot = f.read(slotSize)
+            if len(slot) < slotSize:
+                break
+            if slot[0:1] == b'1' or slot[0:1] == b'2':
+                pkLine, dbLine = decodeSlot(slot)
+                slots[pkLine[0:5]] = slotNo
+                if slot[0:1] == b'2':
+                    balanceSlots.add(pkLine[0:5])
+                accounts.append([pkLine, dbLine])
+            else:
+                freeSlots.append(slotNo)
+            slotNo += 1
+    return accounts
+
+
+def readLines(db):
+    # returns the accounts in the form of the lines of db, which is userPK.txt or userDB.txt
+    # so they can be indexed exactly like the text files
+    lines = []
+    for pkLine, dbLine in loadRecords():
+        if db == 'userPK.txt':
+            lines.append(pkLine + '\n')
+        else:
+            lines.append(dbLine + '\n')
+    return lines
+
+
+def writeSlot(slotNo, data):
+    # writes data at the start of slot slotNo and forces it to disk
+    with open(recordFile, 'r+b') as f:
+        f.seek(slotNo * slotSize)
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    fileWritten(recordFile)
+
+
+def writeRecord(id, pkLine, dbLine):
+    # writes an account to its slot, a new account takes a free slot or a new one at the end
+    # lines are given without their line breaks
+    # returns an error message if the account does not fit in a slot
+    if slots is None:
+        loadRecords()
+    data = encodeSlot(pkLine, dbLine)
+    if data is None:
+        return 'Error: account details are too long'
+    if id in slots:
+        slotNo = slots[id]
+    elif freeSlots != []:
+        slotNo = freeSlots.pop(0)
+    else:
+        slotNo = os.path.getsize(recordFile) // slotSize
+    writeSlot(slotNo, data)
+    slots[id] = slotNo
+    balanceSlots.add(id)
+    return 'Successful'
+
+
+def mapStore():
+    # returns accounts.dat mapped into memory, mapping it again if the file has grown or been replaced
+    global mapped, mappedSize
+    size = os.path.getsize(recordFile)
+    if mapped is None or mappedSize != size:
+        unmapStore()
+        with open(recordFile, 'r+b') as f:
+            mapped = mmap.mmap(f.fileno(), size)
+        mappedSize = size
+    return mapped
+
+
+def unmapStore():
+    # closes the mapping of accounts.dat
+    global mapped
+    if mapped is not None:
+        mapped.close()
+        mapped = None
+
+
+def writeBalance(id, balance):
+    # changes the balance of account id in place, only the page holding its slot is written
+    # balance is an integer in the form of a string
+    # returns an error message if the slot has no balance field yet or the balance does not fit,
+    # the caller then writes the whole account with writeRecord()
+    if slots is None:
+        loadRecords()
+    if id not in balanceSlots:
+        return 'Error: slot has no balance field'
+    data = balance.encode()
+    if len(data) > balanceSize:
+        return 'Error: balance is too long'
+    offset = slots[id] * slotSize + 1
+    store = mapStore()
+    store[offset:offset + balanceSize] = data.rjust(balanceSize)
+    # flush the page holding the balance, flush() needs an offset that is a multiple of the page size
+    pageStart = offset - offset % mmap.ALLOCATIONGRANULARITY
+    store.flush(pageStart, offset + balanceSize - pageStart)
+    fileWritten(recordFile)
+    return 'Successful'
+
+
+def removeRecord(id):
+    # marks the slot of account id as free
+    if slots is None:
+        loadRecords()
+    if id not in slots:
+        return
+    slotNo = slots.pop(id)
+    balanceSlots.discard(id)
+    writeSlot(slotNo, b'0')
+    freeSlots.append(slotNo)
+
+
+def createStore(accounts):
+    # creates accounts.dat from a list of [userPK.txt line, userDB.txt line]
+    # returns an error message if an account does not fit in a slot
+    global slots, freeSlots
+    data = []
+    for pkLine, dbLine in accounts:
+        slot = encodeSlot(pkLine, dbLine)
+        if slot is None:
+            return 'Error: account ' + pkLine[0:5] + ' is too long for the record store'
+        data.append(slot)
+    with open(recordFile + '.tmp', 'wb') as f:
+        f.write(b''.join(data))
+        f.flush()
+        os.fsync(f.fileno())
+    unmapStore()
+    os.replace(recordFile + '.tmp', recordFile)
+    slots = None
+    freeSlots = []
+    return 'Successful'
+
+
+def filesChanged(changed):
+    # called by storeLock in process mode, the slots are read again if another process changed the store
+    global slots
+    if recordFile in changed:
+        slots = None
+        unmapStore()
+
+
+addWatcher(filesChanged)
@@ -0,0 +1,108 @@
+# output of tables and rows
+# a table row is drawn as 4 lines: a spacer, the values padded to their column widths, a spacer and a rule
+# only the value line changes from row to row, so the other 3 are made once per table, and rows are
+# collected into pages that are written with one write() each instead of four print() calls per row
+# rows can also be written as CSV or as JSON lines (one object per row) for other programs to read
+
+# importing modules
+import csv
+import json
+import sys
+
+# number of rows collected before they are written
+pageSize = 200
+# output formats understood by writeRows()
+formats = ['table', 'csv', 'jsonl']
+
+
+def tableLines(colLens):
+    # returns the spacer line and the rule line of a table whose columns are colLens wide
+    spacer = []
+    rule = []
+    for width in colLens:
+        spacer.append(' ' * (width + 4) + '|')
+        rule.append('_' * (width + 4) + '|')
+    return ''.join(spacer), ''.join(rule)
+
+
+def rowText(row, colLens, spacer, rule):
+    # returns the 4 lines of one table row
+    # values longer than their column are not cut, the same as the original table()
+    if len(row) != len(colLens):
+        # a row with fewer values only draws the lines of its own cells
+        spacer, rule = tableLines(colLens[:len(row)])
+    cells = []
+    for index, val in enumerate(row):
+        cells.append('  ' + val.ljust(colLens[index]) + '  |')
+    return spacer + '\n' + ''.join(cells) + '\n' + spacer + '\n' + rule + '\n'
+
+
+def writeHeading(heading, out=None):
+    # writes the heading of a table between two rules
+    rule = '___________________________________________________________________________________________________________'
+    (out or sys.stdout).write(rule + '\n' + heading + '\n' + rule + '\n')
+
+
+def writePages(texts, out=None, pager=None, size=None):
+    # writes the strings of texts a page at a time
+    # pager is called after every full page and stops the output if it returns False
+    # returns the number of strings written
+    out = out or sys.stdout
+    size = size or pageSize
+    page = []
+    written = 0
+    for text in texts:
+        page.append(text)
+        if len(page) == size:
+            out.write(''.join(page))
+            written = written + len(page)
+            page = []
+            if pager is not None:
+                out.flush()
+                if not pager():
+                    return written
+    if page != []:
+        out.write(''.join(page))
+        written = written + len(page)
+    return written
+
+
+def writeTable(rows, colLens, out=None, pager=None):
+    # writes rows as table rows with the given column widths, see writePages() for pager
+    spacer, rule = tableLines(colLens)
+    return writePages((rowText(row, colLens, spacer, rule) for row in rows), out, pager)
+
+
+class LineBuffer:
+    # file-like object that keeps the lines written to it, used to let csv.writer format one row at a time
+
+    def __init__(self):
+        self.text = ''
+
+    def write(self, text):
+        self.text = text
+
+
+def csvLines(header, rows):
+    # generator of the CSV lines of header followed by rows
+    buffer = LineBuffer()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(header)
+    yield buffer.text
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.text
+
+
+def jsonLines(header, rows):
+    # generator of one JSON object per row, the keys are the values of header
+    for row in rows:
+        yield json.dumps(dict(zip(header, row))) + '\n'
+
+
+def writeRows(format, header, rows, out=None):
+    # writes header and rows as csv or jsonl, full pages at a time and without a pager
+    # returns the number of lines written
+    if format == 'csv':
+        return writePages(csvLines(header, rows), out)
+    return writePages(jsonLines(header, rows), out)
@@ -0,0 +1,82 @@
+# per-account daily and monthly totals of the transaction log
+# the monthly totals are kept up to date: the transaction index (owaisbank.txindex) adds every row it indexes,
+# so they follow withdraw() and deposit() as they append to transactions.txt and are rebuilt whenever the index is
+# a month or year overview then adds up one total per month instead of reading the rows of its range
+# the daily totals are worked out from the running totals the index keeps for every row when a summary asks for
+# them: in a sparse log a day holds about one row, so keeping them would take as much memory as the index
+# without saving any work
+# balances are not kept here, closing balances come from the running totals of the index
+
+# importing modules
+import bisect
+from array import array
+
+from owaisbank.dates import monthStart
+
+# {id: array of start, deposits, withdrawals, count} 4 items for each month of the account with rows, in date
+# order, start is the ordinal of the first day of the month
+# totals that do not fit in 64 bits are kept in a list instead
+months = {}
+
+
+def clear():
+    # forgets every total, called when the transaction index is read or rebuilt
+    months.clear()
+
+
+def addRow(id, ordinal, change):
+    # adds a row of account id dated ordinal with the signed amount change to the totals of its month
+    start = monthStart(ordinal)
+    totals = months.get(id)
+    if totals is None:
+        totals = months[id] = array('q')
+    # rows are normally added in date order, so their month is the last one or a new one after it
+    position = len(totals)
+    while position > 0 and totals[position - 4] > start:
+        position -= 4
+    if position == len(totals) and (position == 0 or totals[position - 4] != start):
+        totals.extend((start, 0, 0, 0))
+        position += 4
+    elif position == 0 or totals[position - 4] != start:
+        totals[position:position] = array('q', [start, 0, 0, 0])
+        position += 4
+    # deposits, or withdrawals for a row that is not a deposit
+    column = position - 3 if change > 0 else position - 2
+    try:
+        totals[column] += abs(change)
+    except OverflowError:
+        totals = months[id] = list(totals)
+        totals[column] += abs(change)
+    totals[position - 1] += 1
+
+
+def monthTotals(id, sdate, edate):
+    # returns [[start, deposits, withdrawals, count], ...] in date order for the months of account id with rows,
+    # from the month holding the ordinal sdate to edate
+    totals = months.get(id, [])
+    sdate = monthStart(sdate)
+    rows = []
+    for position in range(0, len(totals), 4):
+        if sdate <= totals[position] <= edate:
+            rows.append(list(totals[position:position + 4]))
+    return rows
+
+
+def dayTotals(dates, running, sdate, edate):
+    # returns [[start, deposits, withdrawals, count], ...] in date order for the days of an account with rows,
+    # from sdate to edate
+    # dates and running are the date ordinals and running totals of the rows of the account, in date order
+    # the change of a row is the difference between its running total and the one before it
+    rows = []
+    for position in range(bisect.bisect_left(dates, sdate), bisect.bisect_right(dates, edate)):
+        ordinal = dates[position]
+        if rows == [] or rows[len(rows) - 1][0] != ordinal:
+            rows.append([ordinal, 0, 0, 0])
+        total = rows[len(rows) - 1]
+        change = running[position] - (running[position - 1] if position > 0 else 0)
+        if change > 0:
+            total[1] += change
+        elif change < 0:
+            total[2] -= change
+        total[3] += 1
+    return rows
@@ -0,0 +1,197 @@
+# asyncio network server for the owais banking system
+# clients send one JSON object per line and get one JSON object per line back, so one process can serve
+# many tellers at once instead of one person at the keyboard
+# the engine functions block on disk, so they run on a pool of threads while the event loop keeps serving
+
+# every connection starts by logging in, like the command line interface:
+#   {"op": "login", "type": "user" or "admin", "id": "10000", "password": "..."}
+# then it may send the operations its account type is allowed to use:
+#   user:  read(column), withdraw(value, desc), deposit(value, desc), genStat(sdate, edate[, format]),
+#          summary(period, sdate, edate)
+#   admin: read(id, column), edit(id, column, value), genStat(id, sdate, edate[, format]),
+#          summary(id, period, sdate, edate),
+#          transfer(sender, receiver, value, desc), metrics()
+# for example {"op": "withdraw", "value": "10", "desc": "lunch"}
+# arguments are strings or numbers, and like the command line interface an admin can only edit
+# column 4 (date of birth) and column 5 (address)
+# the format of genStat is table (the default), csv or jsonl
+# replies are {"ok": true, "result": ...} or {"ok": false, "error": "..."}
+# a user can only use their own account and transfers are made in the name of the logged in admin
+# metrics returns the engine metrics in the prometheus text format, see owaisbank.metrics
+
+# starting the server:
+#   python -m owaisbank.server [host] [port]    (defaults to 127.0.0.1 8765)
+#   python -m owaisbank.server unix:/path/to/socket
+
+# importing modules
+import asyncio
+import io
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from owaisbank.engine import loadIndexes, read, edit, withdraw, deposit, transfer, genStat, genSummary
+from owaisbank.locks import enableProcessLocks
+from owaisbank.metrics import configureMetrics, prometheusText
+from owaisbank.sessions import Session
+
+# longest request line accepted, in bytes
+lineLimit = 65536
+
+
+def statement(id, sdate, edate, format='table'):
+    # runs genStat() and returns its status together with the statement it drew
+    out = io.StringIO()
+    status = genStat(id, sdate, edate, out, format)
+    return {'status': status, 'statement': out.getvalue()}
+
+
+def summary(id, period, sdate, edate):
+    # runs genSummary() and returns its status together with the table it drew
+    out = io.StringIO()
+    status = genSummary(id, period, sdate, edate, out)
+    return {'status': status, 'summary': out.getvalue()}
+
+
+def operation(session, request):
+    # returns the function to run for request and its arguments, all taken from the request and the session
+    # raises KeyError if an argument is missing and ValueError if the operation is not allowed
+    op = request.get('op')
+    if session.type == 'user':
+        id = session.id
+        if op == 'read':
+            return read, (id, 'userDB.txt', request['column'])
+        if op == 'withdraw':
+            return withdraw, (id, request['value'], request['desc'])
+        if op == 'deposit':
+            return deposit, (id, request['value'], request['desc'])
+        if op == 'genStat':
+            return statement, (id, request['sdate'], request['edate'], request.get('format', 'table'))
+        if op == 'summary':
+            return summary, (id, request['period'], request['sdate'], request['edate'])
+    elif session.type == 'admin':
+        if op == 'read':
+            return read, (request['id'], 'userDB.txt', request['column'])
+        if op == 'edit':
+            if str(request['column']) not in ['4', '5']:
+                raise ValueError('only column 4 (date of birth) and column 5 (address) can be edited')
+            return edit, (request['id'], request['column'], request['value'])
+        if op == 'genStat':
+            return statement, (request['id'], request['sdate'], request['edate'], request.get('format', 'table'))
+        if op == 'summary':
+            return summary, (request['id'], request['period'], request['sdate'], request['edate'])
+        if op == 'transfer':
+            return transfer, (session.id, request['sender'], request['receiver'], request['value'],
+                              request['desc'])
+        if op == 'metrics':
+            return prometheusText, ()
+    raise ValueError('operation not allowed: ' + str(op))
+
+
+async def handle(request, session, pool):
+    # answers one request of a connection
+    loop = asyncio.get_running_loop()
+    if not isinstance(request, dict):
+        return {'ok': False, 'error': 'request must be a JSON object'}
+    if request.get('op') == 'login':
+        # only user and admin accounts can log in over the network
+        valid = False
+        if request.get('type') in ['user', 'admin']:
+            try:
+                valid = await loop.run_in_executor(pool, session.login, request['type'], request.get('id'),
+                                                   request.get('password'))
+            except Exception:
+                valid = False
+        if not valid:
+            return {'ok': False, 'error': 'wrong id or password'}
+        return {'ok': True, 'result': 'Log in successful'}
+    if not session.loggedIn():
+        return {'ok': False, 'error': 'log in first'}
+    try:
+        function, args = operation(session, request)
+    except KeyError as missing:
+        return {'ok': False, 'error': 'missing argument ' + str(missing)}
+    except ValueError as error:
+        return {'ok': False, 'error': str(error)}
+    # every argument the engine receives is a string, like the values typed into the command line interface
+    # numbers are converted, anything else (null, true, false, lists and objects) is refused
+    for arg in args:
+        if isinstance(arg, bool) or not isinstance(arg, (str, int, float)):
+            return {'ok': False, 'error': 'arguments must be strings or numbers'}
+    args = [str(arg) for arg in args]
+    # an error in the engine fails the request instead of closing the connection
+    try:
+        result = await loop.run_in_executor(pool, function, *args)
+    except Exception as error:
+        return {'ok': False, 'error': 'operation failed: ' + str(error)}
+    return {'ok': True, 'result': result}
+
+
+async def serveClient(reader, writer, pool):
+    # serves one connection until the client closes it
+    session = Session()
+    try:
+        while True:
+            try:
+                line = await reader.readline()
+            except (asyncio.LimitOverrunError, ValueError):
+                writer.write(b'{"ok": false, "error": "request too long"}\n')
+                break
+            if not line:
+                break
+            if line.strip() == b'':
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError:
+                reply = {'ok': False, 'error': 'invalid JSON'}
+            else:
+                reply = await handle(request, session, pool)
+            writer.write(json.dumps(reply).encode() + b'\n')
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host='127.0.0.1', port=8765, path=None, workers=8):
+    # runs the server until it is stopped
+    # path is the file name of a unix socket to listen on instead of host and port
+    # workers is the number of threads that run the engine functions
+    # command line sessions may use the same data files, so take the process locks where possible
+    enableProcessLocks()
+    configureMetrics()
+    loadIndexes()
+    pool = ThreadPoolExecutor(max_workers=workers)
+
+    async def client(reader, writer):
+        await serveClient(reader, writer, pool)
+
+    if path is not None:
+        server = await asyncio.start_unix_server(client, path=path, limit=lineLimit)
+    else:
+        server = await asyncio.start_server(client, host, port, limit=lineLimit)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        pool.shutdown()
+
+
+def main(args):
+    # reads the address from the command line arguments and starts the server
+    if len(args) > 0 and args[0].startswith('unix:'):
+        asyncio.run(serve(path=args[0][len('unix:'):]))
+        return
+    host = '127.0.0.1'
+    port = 8765
+    if len(args) > 0:
+        host = args[0]
+    if len(args) > 1:
+        port = int(args[1])
+    asyncio.run(serve(host, port))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,63 @@
+# logged in sessions of the command line interface and the server
+# a Session remembers which account logged in, so commands take the id from it instead of asking again
+# or reading it back from a file
+# credentials are checked against the account index: one dictionary lookup and one comparison, no file is read
+
+# importing modules
+from owaisbank.engine import findLine, getIndex
+
+# id file of each account type, the superuser has no account file
+idFiles = {'user': 'userPK.txt', 'admin': 'adminPK.txt'}
+superPassword = 'supass'
+
+
+def accountExists(type, id):
+    # returns True if id is an account of type user or admin
+    if type not in idFiles:
+        return False
+    return findLine(idFiles[type], str(id)) != -1
+
+
+def checkPassword(type, id, password):
+    # returns True if password is the password of account id of type user or admin
+    if type not in idFiles:
+        return False
+    idfile = idFiles[type]
+    position = findLine(idfile, str(id))
+    if position == -1:
+        return False
+    # id file entries are in the format: xxxxx,password
+    return ','.join(getIndex(idfile)['records'][position])[6:] == str(password) + '\n'
+
+
+class Session:
+    # the account logged in to one session
+    # type is user, admin or super and id is the account id (SU for the superuser), both None when logged out
+
+    def __init__(self):
+        self.type = None
+        self.id = None
+
+    def login(self, type, id, password):
+        # logs in to account id of type user, admin or super if password matches
+        # returns True if the session is now logged in
+        if type == 'super':
+            valid = password == superPassword
+            id = 'SU'
+        else:
+            valid = checkPassword(type, id, password)
+        if valid:
+            self.type = type
+            self.id = str(id)
+        return valid
+
+    def confirm(self, password):
+        # returns True if password is the password of the logged in account, used to confirm a transaction
+        return checkPassword(self.type, self.id, password)
+
+    def logout(self):
+        self.type = None
+        self.id = None
+
+    def loggedIn(self):
+        return self.type is not None
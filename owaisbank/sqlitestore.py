@@ -0,0 +1,246 @@
+# sqlite storage backend
+# accounts, transactions and transfers are kept in one sqlite database instead of the text files
+# accounts are keyed by account type and id, and transactions have an index on (account, date), so lookups and
+# statements are answered by sqlite's b-trees, and the database runs in WAL mode so readers do not block writers
+# the first time the database is opened it is filled from the existing text files (or the record store), with the
+# transactions read through the text repository so monthly partitions and archived months are copied too
+
+# importing modules
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date
+
+from owaisbank.config import setting
+from owaisbank.locks import watchedFiles, fileWritten
+from owaisbank.dates import dateOrdinal, monthStart, monthEnd
+from owaisbank.storage import Repository, TextRepository, RecordRepository, accountLines
+from owaisbank import records as recordStore
+
+schema = '''
+CREATE TABLE IF NOT EXISTS accounts (
+    kind TEXT NOT NULL,
+    id TEXT NOT NULL,
+    pk TEXT NOT NULL,
+    db TEXT NOT NULL,
+    PRIMARY KEY (kind, id)
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    date TEXT NOT NULL,
+    ordinal INTEGER NOT NULL,
+    id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    value TEXT NOT NULL,
+    description TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS transactions_account ON transactions (id, ordinal);
+CREATE TABLE IF NOT EXISTS transfers (
+    date TEXT NOT NULL,
+    id TEXT NOT NULL,
+    value TEXT NOT NULL,
+    description TEXT NOT NULL
+);
+'''
+
+# kind and column of each account file, pk holds the userPK.txt/adminPK.txt line and db the other one
+accountFiles = {'userPK.txt': ('user', 'pk'), 'userDB.txt': ('user', 'db'),
+                'adminPK.txt': ('admin', 'pk'), 'adminDB.txt': ('admin', 'db')}
+
+
+def transactionRow(line):
+    # splits a row of transactions.txt into the values of the transactions table
+    # the description is everything after the fourth comma
+    row = line.replace('\r\n', '\n').rstrip('\n').split(',', 4)
+    while len(row) < 5:
+        row.append('')
+    return (row[0], dateOrdinal(row[0]), row[1], row[2], row[3], row[4])
+
+
+def transferRow(line):
+    # splits a row of transfers.txt into the values of the transfers table
+    row = line.replace('\r\n', '\n').rstrip('\n').split(',', 3)
+    while len(row) < 4:
+        row.append('')
+    return tuple(row)
+
+
+class SqliteRepository(Repository):
+
+    def __init__(self, path):
+        self.path = path
+        # sqlite connections cannot be shared between threads, each thread opens its own
+        self.local = threading.local()
+        # in process mode, a change to the database by another process makes the account index stale
+        for name in self.storeFiles():
+            if name not in watchedFiles:
+                watchedFiles.append(name)
+        if not os.path.exists(path):
+            self.importText()
+        else:
+            self.connection().executescript(schema)
+
+    def connection(self):
+        # returns the connection of the current thread, opening it if needed
+        if getattr(self.local, 'connection', None) is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            # in WAL mode a commit is only synced to disk straight away with synchronous FULL,
+            # which is only needed for durability fsync (see owaisbank.logwriter)
+            if setting('durability') == 'fsync':
+                connection.execute('PRAGMA synchronous=FULL')
+            else:
+                connection.execute('PRAGMA synchronous=NORMAL')
+            self.local.connection = connection
+        return self.local.connection
+
+    @contextmanager
+    def transaction(self):
+        # holds a sqlite transaction of the current thread for the duration of a with block, it is committed at the
+        # end of the block or rolled back if the block raises an error
+        # the database pages are changed in place, so another process is told through the generations of
+        # owaisbank.locks that the database has changed
+        with self.connection() as connection:
+            yield connection
+        for name in self.storeFiles():
+            fileWritten(name)
+
+    def importText(self):
+        # creates the database and copies the accounts, transactions and transfers from the text files
+        if recordStore.available():
+            source = RecordRepository()
+        else:
+            source = TextRepository()
+        connection = self.connection()
+        connection.executescript(schema)
+        with connection:
+            for kind in ['user', 'admin']:
+                pkLines = source.loadLines(kind + 'PK.txt')
+                dbLines = source.loadLines(kind + 'DB.txt')
+                for position in range(min(len(pkLines), len(dbLines))):
+                    # the first of two lines with the same id wins, the same as the account index
+                    connection.execute('INSERT OR IGNORE INTO accounts VALUES (?, ?, ?, ?)',
+                                       (kind, pkLines[position][0:5], pkLines[position][:-1], dbLines[position][:-1]))
+            # every row the text repository would show, wherever it is kept
+            rows = source.scanTransactions(0, date.max.toordinal())
+            connection.executemany('INSERT INTO transactions VALUES (?, ?, ?, ?, ?, ?)',
+                                   (transactionRow(','.join(row)) for row in rows))
+            if os.path.exists('transfers.txt'):
+                with open('transfers.txt', 'r') as f:
+                    connection.executemany('INSERT INTO transfers VALUES (?, ?, ?, ?)',
+                                           (transferRow(line) for line in f if line.strip() != ''))
+
+    def loadLines(self, db):
+        kind, column = accountFiles[db]
+        cursor = self.connection().execute('SELECT ' + column + ' FROM accounts WHERE kind = ? ORDER BY rowid',
+                                           (kind,))
+        lines = []
+        for row in cursor:
+            lines.append(row[0] + '\n')
+        return lines
+
+    def addAccount(self, idfile, db, pkLine, dbLine):
+        kind = accountFiles[db][0]
+        try:
+            with self.transaction() as connection:
+                connection.execute('INSERT INTO accounts VALUES (?, ?, ?, ?)',
+                                   (kind, pkLine[0:5], pkLine[:-1], dbLine[:-1]))
+        except sqlite3.IntegrityError:
+            return 'Error: duplicate entry'
+        return 'Successful'
+
+    def saveChanges(self, entries):
+        return self.saveWithRows(entries, [], [])
+
+    def saveWithRows(self, entries, transactions, transfers):
+        # every changed account is updated and the rows are inserted in one sqlite transaction
+        saved = []
+        with self.transaction() as connection:
+            for entry in entries:
+                if entry[0] in saved:
+                    continue
+                pkLine, dbLine = accountLines(entry[0])
+                connection.execute("UPDATE accounts SET db = ? WHERE kind = 'user' AND id = ?", (dbLine, entry[0]))
+                saved.append(entry[0])
+            connection.executemany('INSERT INTO transactions VALUES (?, ?, ?, ?, ?, ?)',
+                                   [transactionRow(line) for line in transactions])
+            connection.executemany('INSERT INTO transfers VALUES (?, ?, ?, ?)', [transferRow(line) for line in transfers])
+        return 'Successful'
+
+    def removeAccount(self, idfile, db, id):
+        with self.transaction() as connection:
+            connection.execute('DELETE FROM accounts WHERE kind = ? AND id = ?', (accountFiles[db][0], id))
+
+    def savePassword(self, idfile, id):
+        from owaisbank.engine import getIndex, findLine
+        pkLine = ','.join(getIndex(idfile)['records'][findLine(idfile, id)])[:-1]
+        with self.transaction() as connection:
+            connection.execute('UPDATE accounts SET pk = ? WHERE kind = ? AND id = ?',
+                               (pkLine, accountFiles[idfile][0], id))
+        return 'Successful'
+
+    def appendTransactions(self, lines):
+        with self.transaction() as connection:
+            connection.executemany('INSERT INTO transactions VALUES (?, ?, ?, ?, ?, ?)',
+                                   [transactionRow(line) for line in lines])
+
+    def iterTransactions(self, id, sdate, edate):
+        # rows are read from the cursor one at a time
+        cursor = self.connection().execute(
+            'SELECT date, id, type, value, description FROM transactions WHERE id = ? AND ordinal BETWEEN ? AND ? '
+            'ORDER BY ordinal, rowid', (id, sdate, edate))
+        for row in cursor:
+            yield [row[0], row[1], row[2], row[3], row[4] + '\n']
+
+    def scanTransactions(self, sdate, edate):
+        cursor = self.connection().execute(
+            'SELECT date, id, type, value, description FROM transactions WHERE ordinal BETWEEN ? AND ? '
+            'ORDER BY ordinal, rowid', (sdate, edate))
+        for row in cursor:
+            yield [row[0], row[1], row[2], row[3], row[4] + '\n']
+
+    def changeSince(self, id, sdate):
+        # summed by sqlite over the (id, ordinal) index
+        change = "CASE type WHEN 'w' THEN -CAST(value AS INTEGER) WHEN 'd' THEN CAST(value AS INTEGER) ELSE 0 END"
+        row = self.connection().execute('SELECT COALESCE(SUM(' + change + '), 0) FROM transactions '
+                                        'WHERE id = ? AND ordinal >= ?', (id, sdate)).fetchone()
+        return row[0]
+
+    def rollup(self, id, period, sdate, edate):
+        # grouped by sqlite over the (id, ordinal) index, months are grouped on the mm/yyyy part of the date
+        if period == 'm':
+            sdate = monthStart(sdate)
+            edate = monthEnd(edate)
+            group = 'substr(date, 4, 7)'
+        else:
+            group = 'ordinal'
+        cursor = self.connection().execute(
+            "SELECT MIN(ordinal), SUM(CASE type WHEN 'd' THEN CAST(value AS INTEGER) ELSE 0 END), "
+            "SUM(CASE type WHEN 'w' THEN CAST(value AS INTEGER) ELSE 0 END), COUNT(*) FROM transactions "
+            'WHERE id = ? AND ordinal BETWEEN ? AND ? GROUP BY ' + group + ' ORDER BY MIN(ordinal)', (id, sdate, edate))
+        rows = []
+        for row in cursor:
+            start = row[0]
+            if period == 'm':
+                start = monthStart(start)
+            rows.append([start, row[1], row[2], row[3]])
+        return rows
+
+    def summary(self, id, sdate, edate):
+        # the running change is a window sum in date order, the same order as iterTransactions()
+        change = "CASE type WHEN 'w' THEN -CAST(value AS INTEGER) WHEN 'd' THEN CAST(value AS INTEGER) ELSE 0 END"
+        row = self.connection().execute(
+            'SELECT COUNT(*), COALESCE(SUM(change), 0), MIN(running), MAX(running), MAX(LENGTH(value)), '
+            'MAX(LENGTH(description)) FROM (SELECT value, description, ' + change + ' AS change, SUM(' + change + ') '
+            'OVER (ORDER BY ordinal, rowid) AS running FROM transactions '
+            'WHERE id = ? AND ordinal BETWEEN ? AND ?)', (id, sdate, edate)).fetchone()
+        if row[0] == 0:
+            return [0, 0, 0, 0, 0, 0]
+        return [row[0], row[1], min(0, row[2]), max(0, row[3]), row[4], row[5]]
+
+    def appendTransfers(self, lines):
+        with self.transaction() as connection:
+            connection.executemany('INSERT INTO transfers VALUES (?, ?, ?, ?)', [transferRow(line) for line in lines])
+
+    def storeFiles(self):
+        return {self.path, self.path + '-wal'}
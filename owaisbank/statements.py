@@ -0,0 +1,102 @@
+# month-end statements for many accounts at once
+# the transaction log is read once and its rows are split by account, then the statements are drawn by a pool
+# of processes, each into its own file <directory>/<id>.txt
+# every file holds the same statement genStat() draws for that account
+
+# usage: python -m owaisbank.statements sdate edate [directory] [workers]
+
+# importing modules
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from owaisbank.dates import dateOrdinal
+from owaisbank.engine import findLine, getIndex, validateDate, statementColumns, measureRows, drawStatement
+from owaisbank.engine import balanceBroughtDown
+from owaisbank.locks import storeLock
+from owaisbank.logwriter import logWriter
+from owaisbank.storage import repository
+
+
+def writeStatement(job):
+    # draws one statement into its file, runs in a worker process
+    # job is (id, balance b/d, rows, path), rows are the rows of the account in date order
+    id, balbd, rows, path = job
+    colLens = statementColumns()
+    change, lowest, highest = measureRows(rows, colLens)
+    with open(path, 'w') as out:
+        drawStatement(id, balbd, rows, colLens, lowest, highest, out)
+    return id
+
+
+def bulkStatements(sdate, edate, directory='statements', workers=None, ids=None):
+    # writes the statements of every user account between sdate and edate, or only of the accounts in ids
+    # edate and sdate are in the format dd/mm/yyyy
+    # directory is created if it does not exist
+    # workers is the number of processes, one per core if it is not given
+    # with a single worker the statements are drawn in this process, a pool would only add overhead
+    if not (validateDate(sdate) and validateDate(edate)):
+        return 'Error: invalid dates'
+    sdate = dateOrdinal(sdate)
+    edate = dateOrdinal(edate)
+    if sdate > edate:
+        return 'Error: Start date cannot be larger than End date'
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        return 'Error: workers must be at least 1'
+
+    # the log is read in one pass while no rows are appended to it
+    with storeLock:
+        logWriter.flush()
+        if ids is None:
+            ids = []
+            for record in getIndex('userPK.txt')['records']:
+                ids.append(record[0])
+        accounts = {}
+        for id in ids:
+            if findLine('userPK.txt', id) == -1:
+                return 'Error: account ' + id + ' does not exist'
+            accounts[id] = []
+        for row in repository().scanTransactions(sdate, edate):
+            if row[1] in accounts:
+                accounts[row[1]].append(row)
+    jobs = []
+    for id in accounts:
+        # the log is in date order apart from rows added out of order, the sort keeps the logged order
+        # for rows of the same date like the transaction index does
+        rows = sorted(accounts[id], key=lambda row: dateOrdinal(row[0]))
+        # each balance b/d is taken with its account locked once storeLock is released, account locks come first
+        # a posting made since the log was read is in both the balance and the change since sdate, so the b/d
+        # stays the same
+        jobs.append((id, balanceBroughtDown(id, sdate), rows, os.path.join(directory, id + '.txt')))
+
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+    if workers == 1:
+        for job in jobs:
+            writeStatement(job)
+        return 'Successful'
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # jobs are sent in chunks so small statements do not cost a round trip each
+        chunk = max(1, len(jobs) // (workers * 4))
+        list(pool.map(writeStatement, jobs, chunksize=chunk))
+    return 'Successful'
+
+
+def main(args):
+    # reads the dates, directory and number of workers from the command line arguments
+    if len(args) < 2:
+        print('usage: python -m owaisbank.statements sdate edate [directory] [workers]')
+        return
+    directory = 'statements'
+    workers = None
+    if len(args) > 2:
+        directory = args[2]
+    if len(args) > 3:
+        workers = int(args[3])
+    print(bulkStatements(args[0], args[1], directory, workers))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
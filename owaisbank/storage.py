@@ -0,0 +1,529 @@
+# storage backends of the banking system
+# the engine keeps its account index in memory and asks the repository returned by repository() to read and
+# write the data, so where the data lives can change without changing the engine
+# accounts are passed around in the layout of the text files: the lines of userPK.txt, userDB.txt, adminPK.txt
+# and adminDB.txt, and the rows of transactions.txt as [date, id, type, value, desc\n] lists
+# a repository reads the account index from the engine when it needs the current contents of an account
+
+# backends:
+#   text     userPK.txt, userDB.txt, adminPK.txt, adminDB.txt with the journal, transactions.txt with its
+#            per-account index and optional columnar store, transfers.txt
+#            once they are created, the monthly partitions of owaisbank.partitions replace transactions.txt
+#   records  like text, but user accounts are kept in the slots of accounts.dat
+#   sqlite   everything in one sqlite database (see owaisbank.sqlitestore)
+# the backend is chosen by the backend setting in bank.cfg (see owaisbank.config)
+
+# importing modules
+import os
+from datetime import date
+
+from owaisbank.config import setting
+from owaisbank.journal import readJournal, appendJournal, finishGroup, clearJournal, journalFull
+from owaisbank import journal
+from owaisbank.dates import dateOrdinal, monthStart, monthEnd
+from owaisbank.txindex import rowsAppended, iterRows, changeSince
+from owaisbank import txindex
+from owaisbank import columnar
+from owaisbank import partitions
+from owaisbank import records as recordStore
+
+
+def writeLines(db, lines):
+    # rewrites db with lines
+    # the new contents are written to a temporary file first so a crash never leaves db half written
+    with open(db + '.tmp', 'w') as f:
+        f.write(''.join(lines))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(db + '.tmp', db)
+
+
+def indexLines(db):
+    # returns the lines of db as they are in the engine's account index
+    from owaisbank.engine import getIndex
+    lines = []
+    for record in getIndex(db)['records']:
+        lines.append(','.join(record))
+    return lines
+
+
+def accountLines(id):
+    # returns the userPK.txt and userDB.txt lines of user id from the engine's account index, without line breaks
+    from owaisbank.engine import getIndex, findLine
+    pkRecord = getIndex('userPK.txt')['records'][findLine('userPK.txt', id)]
+    dbRecord = getIndex('userDB.txt')['records'][findLine('userDB.txt', id)]
+    return ','.join(pkRecord)[:-1], ','.join(dbRecord)[:-1]
+
+
+def replayJournal(lines):
+    # applies the journal to the lines of userDB.txt
+    # returns the ids of the accounts that were changed
+    positions = {}
+    for lineNo, line in enumerate(lines):
+        # only the first occurrence of an id is used, same as the account index
+        if line[0:5] not in positions:
+            positions[line[0:5]] = lineNo
+    replayed = []
+    for id, column, value in readJournal():
+        if id in positions:
+            fields = lines[positions[id]].split(',')
+            fields[int(column)] = value
+            lines[positions[id]] = ','.join(fields)
+            replayed.append(id)
+    return replayed
+
+
+def logName(line):
+    # returns the log file a row of transactions.txt is appended to
+    if partitions.available():
+        return partitions.partitionPath(partitions.rowPartition(line)[0])
+    return 'transactions.txt'
+
+
+def rowEntries(transactions, transfers):
+    # returns the journal entries of rows about to be appended to their logs, see owaisbank.journal
+    # each entry is [log file, byte offset the row will start at, row without its line break]
+    logs = []
+    for line in transactions:
+        logs.append([logName(line), line])
+    for line in transfers:
+        logs.append(['transfers.txt', line])
+    sizes = {}
+    entries = []
+    for name, line in logs:
+        if name not in sizes:
+            sizes[name] = os.path.getsize(name) if os.path.exists(name) else 0
+        entries.append([name, str(sizes[name]), line[:-1]])
+        # the logs are written in text mode, so the line break takes the length of the system's line separator
+        sizes[name] += len(line[:-1].encode()) + len(os.linesep)
+    return entries
+
+
+def rowLogged(name, position, row):
+    # returns True if the log file name holds row as a complete line at the byte offset position
+    if not os.path.exists(name):
+        return False
+    with open(name, 'rb') as f:
+        f.seek(position)
+        line = f.readline()
+    return line.endswith(b'\n') and line.rstrip(b'\r\n') == row.encode()
+
+
+class Repository:
+    # operations the engine needs from a storage backend
+    # idfile and db are the names of the text files the account belongs to, such as userPK.txt and userDB.txt
+
+    def loadLines(self, db):
+        # returns the lines of db with their line breaks
+        raise NotImplementedError
+
+    def addAccount(self, idfile, db, pkLine, dbLine):
+        # stores a new account, the lines include their line breaks
+        # returns Successful or an error message
+        raise NotImplementedError
+
+    def saveChanges(self, entries):
+        # makes changes to userDB.txt records durable once they have been made in the account index
+        # entries is a list of [id, column, value] lists, all values are strings
+        # a list of more than one change must be saved all together or not at all
+        # returns Successful or an error message, nothing is saved on an error and the caller undoes the
+        # change in the account index
+        raise NotImplementedError
+
+    def saveWithRows(self, entries, transactions, transfers):
+        # saves changes like saveChanges() together with the rows that log them, all of them or none
+        # transactions and transfers are rows of transactions.txt and transfers.txt with their line breaks
+        # the caller holds storeLock and no rows are waiting in the group commit of owaisbank.logwriter
+        raise NotImplementedError
+
+    def removeAccount(self, idfile, db, id):
+        # deletes an account once it has been removed from the account index
+        raise NotImplementedError
+
+    def savePassword(self, idfile, id):
+        # makes a changed password durable once it has been changed in the account index
+        # returns Successful or an error message, like saveChanges()
+        raise NotImplementedError
+
+    def compact(self):
+        # folds any pending journal into the stored accounts, backends without a journal do nothing
+        pass
+
+    def appendTransactions(self, lines):
+        # appends rows to the transaction log, lines are the rows of transactions.txt with their line breaks
+        raise NotImplementedError
+
+    def iterTransactions(self, id, sdate, edate):
+        # generator of the rows of account id dated between the ordinals sdate and edate inclusive, in date order
+        raise NotImplementedError
+
+    def scanTransactions(self, sdate, edate):
+        # generator of the rows of every account dated between the ordinals sdate and edate inclusive,
+        # read in one pass over the log, rows of the same date are in the order they were logged
+        raise NotImplementedError
+
+    def changeSince(self, id, sdate):
+        # returns the total change of account id made by its transactions dated on or after the ordinal sdate
+        # the default reads those rows, backends override it with a stored running total
+        change = 0
+        for row in self.iterTransactions(id, sdate, date.max.toordinal()):
+            if row[2] == 'w':
+                change = change - int(row[3])
+            elif row[2] == 'd':
+                change = change + int(row[3])
+        return change
+
+    def rollup(self, id, period, sdate, edate):
+        # returns [[start, deposits, withdrawals, count], ...] in date order for the days (period d) or
+        # months (period m) of account id with transactions, from the period holding the ordinal sdate to edate
+        # start is the ordinal of the day or of the first day of the month, months are always whole months
+        # the default reads the rows, backends override it with stored totals
+        if period == 'm':
+            sdate = monthStart(sdate)
+            edate = monthEnd(edate)
+        rows = []
+        for row in self.iterTransactions(id, sdate, edate):
+            start = dateOrdinal(row[0])
+            if period == 'm':
+                start = monthStart(start)
+            if rows == [] or rows[len(rows) - 1][0] != start:
+                rows.append([start, 0, 0, 0])
+            if row[2] == 'd':
+                rows[len(rows) - 1][1] += int(row[3])
+            elif row[2] == 'w':
+                rows[len(rows) - 1][2] += int(row[3])
+            rows[len(rows) - 1][3] += 1
+        return rows
+
+    def summary(self, id, sdate, edate):
+        # returns [count, change, lowest, highest, widest amount, widest description] for the rows of
+        # iterTransactions(), as described in owaisbank.columnar.rangeSummary()
+        # returns None when the backend cannot do this faster than reading the rows
+        return None
+
+    def appendTransfers(self, lines):
+        # appends rows to the transfers log, lines are the rows of transfers.txt with their line breaks
+        raise NotImplementedError
+
+    def syncLogs(self):
+        # makes the rows appended to the transaction and transfer logs durable on disk
+        # backends whose appends are already durable do nothing
+        pass
+
+    def storeFiles(self):
+        # returns the files which, when changed by another process, make every account index stale
+        return set()
+
+
+class TextRepository(Repository):
+    # the original text files, with userDB.txt changes journaled
+    # transactions.txt and transfers.txt are kept open for appending instead of being opened for every group
+
+    def __init__(self):
+        # {file: file object open for appending}
+        self.logFiles = {}
+
+    def logFile(self, name):
+        # returns the open log file name, opening it the first time
+        # appends always go to the end of the file, so it stays usable if the file is cleared
+        if name not in self.logFiles:
+            self.logFiles[name] = open(name, 'a')
+        return self.logFiles[name]
+
+    def loadLines(self, db):
+        if not os.path.exists(db):
+            return []
+        with open(db, 'r') as f:
+            lines = f.readlines()
+        # userDB.txt may be behind the journal, replay the journal to get the latest values
+        if db == 'userDB.txt':
+            replayJournal(lines)
+            self.finishRows()
+        return lines
+
+    def addAccount(self, idfile, db, pkLine, dbLine):
+        with open(db, 'a') as f:
+            f.write(dbLine)
+        with open(idfile, 'a') as f:
+            f.write(pkLine)
+        return 'Successful'
+
+    def saveChanges(self, entries):
+        # userDB.txt itself is only rewritten once the journal is full
+        appendJournal(entries)
+        if journalFull():
+            self.compact()
+        return 'Successful'
+
+    def saveWithRows(self, entries, transactions, transfers):
+        # the changes and the rows are journaled as one group before the rows are appended to their logs,
+        # a crash before they are all there is finished by finishRows() when the journal is next read
+        self.finishRows()
+        appendJournal(entries + rowEntries(transactions, transfers))
+        self.appendLogs(transactions, transfers)
+        finishGroup()
+        if journalFull():
+            self.compact()
+        return 'Successful'
+
+    def appendLogs(self, transactions, transfers):
+        if transactions != []:
+            self.appendTransactions(transactions)
+        if transfers != []:
+            self.appendTransfers(transfers)
+
+    def finishRows(self):
+        # appends the rows of journaled groups that a crash stopped before they were all in their logs
+        # the rows of a log after the first one missing from it are appended again, and a row cut off part way
+        # through is removed first so the next one does not join it
+        rows = journal.unfinished
+        if rows == []:
+            return
+        transactions = []
+        transfers = []
+        missing = {}
+        for name, position, row in rows:
+            if name not in missing:
+                if rowLogged(name, int(position), row):
+                    continue
+                missing[name] = int(position)
+            if name == 'transfers.txt':
+                transfers.append(row + '\n')
+            else:
+                transactions.append(row + '\n')
+        for name in missing:
+            if os.path.exists(name):
+                with open(name, 'r+b') as f:
+                    f.seek(missing[name])
+                    if b'\n' not in f.read():
+                        f.truncate(missing[name])
+        self.appendLogs(transactions, transfers)
+        self.syncLogs()
+        finishGroup()
+
+    def removeAccount(self, idfile, db, id):
+        # rewrite the contents in idfile and db
+        writeLines(db, indexLines(db))
+        writeLines(idfile, indexLines(idfile))
+        # a userDB.txt snapshot contains every journaled change so the journal can be emptied,
+        # once the log rows journaled with them are on disk
+        if db == 'userDB.txt':
+            self.syncLogs()
+            clearJournal()
+
+    def savePassword(self, idfile, id):
+        writeLines(idfile, indexLines(idfile))
+        return 'Successful'
+
+    def compact(self):
+        # writes the journaled changes into a new userDB.txt snapshot and empties the journal
+        # the log rows journaled with the changes are synced first, the journal no longer holds them after
+        writeLines('userDB.txt', indexLines('userDB.txt'))
+        self.syncLogs()
+        clearJournal()
+
+    def appendTransactions(self, lines):
+        if partitions.available():
+            partitions.appendRows(lines)
+            return
+        start = 0
+        if os.path.exists('transactions.txt'):
+            start = os.path.getsize('transactions.txt')
+        f = self.logFile('transactions.txt')
+        f.write(''.join(lines))
+        f.flush()
+        # add the new rows to the per-account transaction index and the columnar store if it is used
+        rowsAppended(lines, start)
+        columnar.rowsAppended(lines, start)
+
+    def iterTransactions(self, id, sdate, edate):
+        if partitions.available():
+            return partitions.iterRows(id, sdate, edate)
+        return iterRows(id, sdate, edate)
+
+    def scanTransactions(self, sdate, edate):
+        # rows are split the same way as iterRows(), and rows the transaction index skips are skipped too
+        if partitions.available():
+            yield from partitions.scanRows(sdate, edate)
+            return
+        if not os.path.exists('transactions.txt'):
+            return
+        with open('transactions.txt', 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                row = line.decode().replace('\r\n', '\n').split(',')
+                if len(row) >= 5 and sdate <= dateOrdinal(row[0]) <= edate:
+                    yield row
+
+    def changeSince(self, id, sdate):
+        # a lookup in the running totals of the transaction index
+        if partitions.available():
+            return partitions.changeSince(id, sdate)
+        return changeSince(id, sdate)
+
+    def rollup(self, id, period, sdate, edate):
+        # the monthly totals kept by owaisbank.rollups and daily totals worked out from the running totals of the
+        # transaction index, or the totals in the indexes of the partitions
+        if partitions.available():
+            return partitions.rollup(id, period, sdate, edate)
+        return txindex.rollup(id, period, sdate, edate)
+
+    def summary(self, id, sdate, edate):
+        # the columnar store answers with numpy instead of reading every row
+        # it is a copy of transactions.txt, so once the log is partitioned the indexes of the partitions answer
+        if partitions.available():
+            return partitions.summary(id, sdate, edate)
+        if columnar.available():
+            return columnar.rangeSummary(id, sdate, edate)
+        return None
+
+    def appendTransfers(self, lines):
+        f = self.logFile('transfers.txt')
+        f.write(''.join(lines))
+        f.flush()
+
+    def syncLogs(self):
+        for f in self.logFiles.values():
+            os.fsync(f.fileno())
+        partitions.syncFiles()
+
+
+class RecordRepository(TextRepository):
+    # user accounts in the slots of accounts.dat, everything else in the text files
+
+    def loadLines(self, db):
+        if db not in ['userPK.txt', 'userDB.txt']:
+            return TextRepository.loadLines(self, db)
+        if not recordStore.available():
+            createRecordStore()
+        lines = recordStore.readLines(db)
+        if db == 'userDB.txt':
+            # the journal only holds a group that was cut off by a crash,
+            # it is finished by writing its accounts to their slots
+            replayed = replayJournal(lines)
+            if replayed != []:
+                pkLines = recordStore.readLines('userPK.txt')
+                for lineNo, line in enumerate(lines):
+                    if line[0:5] in replayed:
+                        recordStore.writeRecord(line[0:5], pkLines[lineNo][:-1], line[:-1])
+            # and the rows journaled with them are appended to the logs they did not reach
+            self.finishRows()
+            if replayed != []:
+                clearJournal()
+        return lines
+
+    def addAccount(self, idfile, db, pkLine, dbLine):
+        if db != 'userDB.txt':
+            return TextRepository.addAccount(self, idfile, db, pkLine, dbLine)
+        # the account is written to one slot in the record store
+        return recordStore.writeRecord(pkLine[0:5], pkLine[:-1], dbLine[:-1])
+
+    def saveChanges(self, entries):
+        return self.saveWithRows(entries, [], [])
+
+    def saveWithRows(self, entries, transactions, transfers):
+        # each account is rewritten in its own slot, a group of changes is journaled first with the rows
+        # so a crash part way through can be finished when the store is next loaded
+        # the journal is emptied once the rows are on disk as well
+        changed = {}
+        for id, column, value in entries:
+            if id not in changed:
+                changed[id] = []
+            changed[id].append(column)
+        # every account is checked before anything is written, so a change that does not fit is not saved at all
+        for id in changed:
+            pkLine, dbLine = accountLines(id)
+            if not recordStore.fits(pkLine, dbLine):
+                return 'Error: account details are too long for the record store'
+        self.finishRows()
+        group = entries + rowEntries(transactions, transfers)
+        if len(group) > 1:
+            appendJournal(group)
+        # accounts where only the balance changed are updated in place, the rest are rewritten whole
+        for id in changed:
+            pkLine, dbLine = accountLines(id)
+            balanceOnly = set(changed[id]) == {'3'}
+            if not (balanceOnly and recordStore.writeBalance(id, dbLine.split(',')[3]) == 'Successful'):
+                recordStore.writeRecord(id, pkLine, dbLine)
+        if transactions != [] or transfers != []:
+            self.appendLogs(transactions, transfers)
+            self.syncLogs()
+        if len(group) > 1:
+            clearJournal()
+        return 'Successful'
+
+    def removeAccount(self, idfile, db, id):
+        if db != 'userDB.txt':
+            return TextRepository.removeAccount(self, idfile, db, id)
+        # only the slot of the account is freed
+        recordStore.removeRecord(id)
+
+    def savePassword(self, idfile, id):
+        if idfile != 'userPK.txt':
+            return TextRepository.savePassword(self, idfile, id)
+        pkLine, dbLine = accountLines(id)
+        return recordStore.writeRecord(id, pkLine, dbLine)
+
+    def compact(self):
+        # every change is written to its slot, so there is nothing to compact
+        pass
+
+    def storeFiles(self):
+        return {recordStore.recordFile}
+
+
+def createPartitions():
+    # moves the rows of transactions.txt into monthly partitions
+    # transactions.txt is left as it is but is no longer used
+    if not os.path.exists('transactions.txt'):
+        return partitions.createPartitions([])
+    with open('transactions.txt', 'r') as f:
+        return partitions.createPartitions(f)
+
+
+def createRecordStore():
+    # moves the user accounts from userPK.txt and userDB.txt, with the journal applied, into accounts.dat
+    # the text files are left as they are but are no longer used for user accounts
+    text = TextRepository()
+    pkLines = text.loadLines('userPK.txt')
+    dbLines = text.loadLines('userDB.txt')
+    accounts = []
+    for position in range(len(pkLines)):
+        accounts.append([pkLines[position][:-1], dbLines[position][:-1]])
+    status = recordStore.createStore(accounts)
+    if status == 'Successful':
+        clearJournal()
+    return status
+
+
+# repository in use, created the first time it is needed
+current = None
+
+
+def repository():
+    # returns the repository chosen by the backend setting
+    global current
+    if current is None:
+        backend = setting('backend')
+        if backend == '':
+            if recordStore.available():
+                backend = 'records'
+            else:
+                backend = 'text'
+        if backend == 'text':
+            current = TextRepository()
+        elif backend == 'records':
+            current = RecordRepository()
+        elif backend == 'sqlite':
+            from owaisbank.sqlitestore import SqliteRepository
+            current = SqliteRepository(setting('database'))
+        else:
+            raise ValueError('unknown storage backend: ' + backend)
+    return current
+
+
+def resetRepository():
+    # forgets the repository in use so the next call to repository() chooses it again
+    global current
+    current = None
@@ -0,0 +1,286 @@
+# per-account index of transactions.txt
+# maps each account id to the byte offsets of its transactions, sorted by date
+# each account has three compact arrays (date ordinals, offsets and running totals) instead of a list of tuples,
+# so a row takes about 20 bytes in memory
+# so a statement only reads the rows of one account in one date range instead of the whole history
+# the index is stored in txindex.txt as id,date ordinal,offset,length,change lines and is only ever appended to
+# change is the signed amount of the row, and the running total of the changes of each account is kept in memory
+# so the change of an account since any date (and from it the balance at that date) is a single lookup
+# every row indexed is added to the monthly totals of owaisbank.rollups, the daily totals are worked out from the
+# running totals when they are asked for
+# before every lookup the index is checked against the size of transactions.txt:
+# rows appended by other means are indexed, and a truncated transactions.txt rebuilds the index
+# in process mode the index lines other processes append to txindex.txt are read from where this process
+# left off, txindex.txt is only read again from the start when it has been emptied or replaced
+
+# importing modules
+import bisect
+import os
+from array import array
+
+from owaisbank.dates import dateOrdinal
+from owaisbank.locks import storeLock, addWatcher
+from owaisbank import rollups
+
+transactionFile = 'transactions.txt'
+indexFile = 'txindex.txt'
+# number of bytes of transactions.txt read at a time when the index catches up with it
+chunkSize = 1 << 20
+
+# {id: array of date ordinals} of the rows of each account, sorted by date then offset
+ordinals = {}
+# {id: array of offsets} of the same rows in transactions.txt
+offsets = {}
+# {id: array of changes} the total change of the account up to and including each of its rows
+# totals that do not fit in 64 bits are kept in a list instead
+totals = {}
+# number of bytes of transactions.txt that are covered by the index, None until the index is loaded
+covered = None
+# txindex.txt open for reading and the number of its bytes read into memory
+# the file stays open so its inode cannot be reused by a new txindex.txt while this process still uses it
+indexHandle = None
+indexEnd = 0
+# True when another process has written to transactions.txt or txindex.txt since the index was last synced
+stale = False
+
+
+def rowChange(type, value):
+    # returns the signed amount of a row, negative for a withdrawal, 0 for a row that is not w or d
+    try:
+        if type == 'w':
+            return -int(value)
+        if type == 'd':
+            return int(value)
+    except ValueError:
+        pass
+    return 0
+
+
+def addEntry(id, ordinal, offset, change):
+    # adds one row to the in-memory index keeping the arrays of the account sorted
+    rollups.addRow(id, ordinal, change)
+    dates = ordinals.get(id)
+    if dates is None:
+        dates = ordinals[id] = array('i')
+        offsets[id] = array('q')
+        totals[id] = array('q')
+    running = totals[id]
+    position = len(dates)
+    total = (running[position - 1] if position > 0 else 0) + change
+    # rows are normally appended in date order so this is usually a plain append
+    if position == 0 or dates[position - 1] <= ordinal:
+        dates.append(ordinal)
+        offsets[id].append(offset)
+        try:
+            running.append(total)
+        except OverflowError:
+            totals[id] = list(running)
+            totals[id].append(total)
+        return
+    # a row dated before the last one goes after the other rows of its date
+    # and moves the totals of every later row
+    position = bisect.bisect_right(dates, ordinal)
+    dates.insert(position, ordinal)
+    offsets[id].insert(position, offset)
+    total = (running[position - 1] if position > 0 else 0) + change
+    running = totals[id] = list(running)
+    running.insert(position, total)
+    for later in range(position + 1, len(running)):
+        running[later] += change
+    # the totals go back in an array unless one of them no longer fits in 64 bits
+    try:
+        totals[id] = array('q', running)
+    except OverflowError:
+        pass
+
+
+def indexLines(lines, start):
+    # indexes raw rows of transactions.txt that begin at byte start
+    # lines is a list of byte strings including their line breaks
+    # returns the index lines to append to txindex.txt
+    global covered
+    newEntries = []
+    offset = start
+    for line in lines:
+        # an unfinished last row is left for the next sync
+        if not line.endswith(b'\n'):
+            break
+        row = line.decode().split(',')
+        if len(row) >= 5:
+            ordinal = dateOrdinal(row[0])
+            if ordinal != -1:
+                change = rowChange(row[2], row[3])
+                addEntry(row[1], ordinal, offset, change)
+                newEntries.append('{0},{1},{2},{3},{4}\n'.format(row[1], ordinal, offset, len(line), change))
+        offset += len(line)
+    covered = offset
+    return newEntries
+
+
+def readTail():
+    # reads the index lines appended to txindex.txt since this process last read it into memory
+    # returns False if txindex.txt has been emptied or replaced since, or was written before changes were
+    # stored, the index then has to be loaded again
+    global indexHandle, indexEnd, covered
+    try:
+        info = os.stat(indexFile)
+    except FileNotFoundError:
+        return indexEnd == 0
+    if indexHandle is None:
+        indexHandle = open(indexFile, 'rb')
+    if os.fstat(indexHandle.fileno()).st_ino != info.st_ino or info.st_size < indexEnd:
+        return False
+    indexHandle.seek(indexEnd)
+    for line in indexHandle:
+        if not line.endswith(b'\n'):
+            break
+        entry = line.decode().split(',')
+        if len(entry) < 5:
+            return False
+        addEntry(entry[0], int(entry[1]), int(entry[2]), int(entry[4]))
+        covered = max(covered, int(entry[2]) + int(entry[3]))
+        indexEnd += len(line)
+    # a line cut off by a crash is removed so the next append does not join it
+    if info.st_size > indexEnd:
+        with open(indexFile, 'r+b') as f:
+            f.truncate(indexEnd)
+    return True
+
+
+def closeIndex():
+    global indexHandle
+    if indexHandle is not None:
+        indexHandle.close()
+        indexHandle = None
+
+
+def clearIndex():
+    # forgets the index and replaces txindex.txt with an empty file
+    # a new file is written instead of emptying the old one so other processes see it was replaced
+    global ordinals, offsets, totals, covered, indexEnd
+    ordinals = {}
+    offsets = {}
+    totals = {}
+    rollups.clear()
+    covered = 0
+    indexEnd = 0
+    closeIndex()
+    with open(indexFile + '.tmp', 'w') as f:
+        f.write('')
+    os.replace(indexFile + '.tmp', indexFile)
+
+
+def loadIndex():
+    # reads txindex.txt into memory
+    # an index written before changes were stored is emptied so it is built again from transactions.txt
+    global ordinals, offsets, totals, covered, indexEnd
+    ordinals = {}
+    offsets = {}
+    totals = {}
+    rollups.clear()
+    covered = 0
+    indexEnd = 0
+    closeIndex()
+    if not readTail():
+        clearIndex()
+
+
+def appendIndex(newEntries):
+    # appends index lines to txindex.txt, this process has already read every line before them
+    global indexEnd
+    with open(indexFile, 'a') as f:
+        f.write(''.join(newEntries))
+        f.flush()
+        indexEnd = os.fstat(f.fileno()).st_size
+
+
+def filesChanged(changed):
+    # called by storeLock in process mode, if another process wrote to the log or the index
+    # the lines it added to txindex.txt are read before the next lookup instead of indexing those rows a second time
+    global stale
+    if 'transactions.txt' in changed or 'txindex.txt' in changed:
+        stale = True
+
+
+addWatcher(filesChanged)
+
+
+def syncIndex():
+    # makes sure every complete row of transactions.txt is in the index
+    global stale
+    # held so two threads do not index the same rows twice
+    with storeLock:
+        if covered is None:
+            loadIndex()
+        elif stale and not readTail():
+            loadIndex()
+        stale = False
+        size = 0
+        if os.path.exists(transactionFile):
+            size = os.path.getsize(transactionFile)
+        if size < covered:
+            # transactions.txt was cleared or replaced, start again
+            clearIndex()
+        if size > covered:
+            # the rows are indexed a chunk at a time so a long unindexed log is never held in memory
+            with open(transactionFile, 'rb') as f:
+                f.seek(covered)
+                while True:
+                    lines = f.readlines(chunkSize)
+                    if lines == []:
+                        break
+                    appendIndex(indexLines(lines, covered))
+
+
+def rowsAppended(lines, start):
+    # records rows that were just appended to transactions.txt
+    # lines is a list of the written rows as strings, start is the size of transactions.txt before the write
+    # if the index was behind, the gap is filled from the file instead
+    if covered is None or stale or covered != start:
+        syncIndex()
+        return
+    encoded = []
+    for line in lines:
+        encoded.append(line.encode())
+    appendIndex(indexLines(encoded, start))
+
+
+def iterRows(id, sdate, edate):
+    # generator that yields the rows of account id dated between the ordinals sdate and edate inclusive
+    # rows are in date order and split into [date, id, type, value, desc\n] lists like readlines().split(',')
+    # only one row is read from transactions.txt at a time
+    syncIndex()
+    dates = ordinals.get(id, [])
+    first = bisect.bisect_left(dates, sdate)
+    last = bisect.bisect_right(dates, edate)
+    if first == last:
+        return
+    positions = offsets[id]
+    with open(transactionFile, 'rb') as f:
+        for position in range(first, last):
+            f.seek(positions[position])
+            yield f.readline().decode().replace('\r\n', '\n').split(',')
+
+
+def changeSince(id, sdate):
+    # returns the total change of account id made by its rows dated on or after the ordinal sdate
+    # the balance of the account at the start of sdate is its current balance less this change
+    with storeLock:
+        syncIndex()
+        if id not in ordinals:
+            return 0
+        running = totals[id]
+        first = bisect.bisect_left(ordinals[id], sdate)
+        before = running[first - 1] if first > 0 else 0
+        return running[len(running) - 1] - before
+
+
+def rollup(id, period, sdate, edate):
+    # returns the daily or monthly totals of account id, see Repository.rollup() in owaisbank.storage
+    with storeLock:
+        syncIndex()
+        if id not in ordinals:
+            return []
+        if period == 'm':
+            return rollups.monthTotals(id, sdate, edate)
+        return rollups.dayTotals(ordinals[id], totals[id], sdate, edate)
@@ -0,0 +1,29 @@
+# runs withdrawals, deposits and transfers from a pool of threads
+# the engine functions take the locks of the accounts they change, so postings on different accounts
+# run side by side while postings on the same account wait for each other
+
+# importing modules
+from concurrent.futures import ThreadPoolExecutor
+
+from owaisbank.engine import withdraw, deposit, transfer
+
+
+def runOperation(operation):
+    # runs a single operation and returns its status
+    # operation is a tuple whose first value is the string w, d or t followed by the arguments of
+    # withdraw(id, value, desc), deposit(id, value, desc) or transfer(id, sender, receiver, value, desc)
+    if operation[0] == 'w':
+        return withdraw(*operation[1:])
+    elif operation[0] == 'd':
+        return deposit(*operation[1:])
+    elif operation[0] == 't':
+        return transfer(*operation[1:])
+    return 'Error: operation can only be w, d or t'
+
+
+def runParallel(operations, workers=8):
+    # runs operations on a pool of workers threads
+    # operations is an iterable of tuples in the form used by runOperation()
+    # returns a list with the status of each operation in the same order as operations
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(runOperation, operations))
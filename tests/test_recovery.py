@@ -0,0 +1,223 @@
+# recovery of the data files after a crash
+# each test runs on a copy of the data files in a temporary directory, and a restart is simulated by
+# forgetting everything the engine keeps in memory
+
+# importing modules
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from datetime import date
+from unittest import mock
+
+from owaisbank import config, engine, journal, locks, partitions, sqlitestore, storage, txindex
+from owaisbank.engine import archiveHistory, batchPost, changePass, deposit, edit, read, transfer, useRecordStore
+
+dataFiles = ['userPK.txt', 'userDB.txt', 'adminPK.txt', 'adminDB.txt', 'transactions.txt', 'transfers.txt']
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def restart():
+    # forgets the in-memory state of the engine, as if the program had been started again
+    engine.accountIndex.clear()
+    storage.resetRepository()
+    config.settings = None
+    journal.journalSize = None
+    txindex.covered = None
+    locks.processMode = False
+    locks.storeLock.stamps = {}
+    locks.storeLock.generations = {}
+    partitions.manifest = None
+    partitions.indexes = {}
+    partitions.closeFiles()
+
+
+class RecoveryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.directory = tempfile.mkdtemp()
+        for name in dataFiles:
+            shutil.copy(os.path.join(root, name), self.directory)
+        os.chdir(self.directory)
+        restart()
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.directory)
+        restart()
+
+    def writeJournal(self, text):
+        with open('journal.txt', 'w') as f:
+            f.write(text)
+
+    def crashTransfer(self, owner, name, stop):
+        # makes a transfer of 7 from 10002 to 10003 with owner.name replaced by stop, which raises
+        # KeyboardInterrupt as if the program had stopped there, then restarts
+        with mock.patch.object(owner, name, stop):
+            self.assertRaises(KeyboardInterrupt, transfer, '00001', '10002', '10003', '7', 'x')
+        restart()
+
+    def assertTransferred(self):
+        # the transfer of crashTransfer() is in both balances and each of its rows is logged once
+        for reads in range(2):
+            self.assertEqual(read('10002', 'userDB.txt', '3'), ['133'])
+            self.assertEqual(read('10003', 'userDB.txt', '3'), ['107'])
+            with open('transactions.txt', 'r') as f:
+                rows = f.read().splitlines()
+            self.assertEqual([len(row.split(',')) for row in rows], [5] * len(rows))
+            self.assertEqual([row[10:] for row in rows if row.endswith(',7,x')], [',10002,w,7,x', ',10003,d,7,x'])
+            with open('transfers.txt', 'r') as f:
+                self.assertEqual(len([row for row in f if row.endswith(',00001,7,x\n')]), 1)
+            # a second restart finds the rows in their logs
+            restart()
+
+    def test_transfer_cut_off_before_its_rows(self):
+        # the balances and the rows of a transfer are journaled but the program stops before any row is logged
+        def appendLogs(repository, transactions, transfers):
+            raise KeyboardInterrupt
+
+        self.crashTransfer(storage.TextRepository, 'appendLogs', appendLogs)
+        self.assertTransferred()
+
+    def test_transfer_row_cut_off(self):
+        # the program stops part way through writing the second transaction row of a transfer
+        def appendLogs(repository, transactions, transfers):
+            with open('transactions.txt', 'a') as f:
+                f.write(transactions[0] + transactions[1][:12])
+            raise KeyboardInterrupt
+
+        self.crashTransfer(storage.TextRepository, 'appendLogs', appendLogs)
+        self.assertTransferred()
+
+    def test_transfer_logged_without_done_line(self):
+        # every row of a transfer is logged but the program stops before the journal says so
+        def finishGroup():
+            raise KeyboardInterrupt
+
+        self.crashTransfer(storage, 'finishGroup', finishGroup)
+        self.assertTransferred()
+
+    def test_log_write_failed(self):
+        # postings whose rows could not be written to the transaction log are reported and their balances put back
+        def appendTransactions(repository, lines):
+            raise OSError('No space left on device')
+
+        with mock.patch.object(storage.TextRepository, 'appendTransactions', appendTransactions):
+            self.assertTrue(deposit('10000', '5', 'x').startswith('Error'))
+            statuses = batchPost([('10002', 'd', '5', 'x'), ('10003', 'w', '5', 'x'), ('10003', 'w', '99', 'x')])
+            self.assertTrue(statuses[0].startswith('Error') and statuses[0] == statuses[1])
+            self.assertEqual(statuses[2], 'Error: Insufficient funds')
+        for reads in range(2):
+            self.assertEqual(read('10000', 'userDB.txt', '3'), ['300'])
+            self.assertEqual(read('10002', 'userDB.txt', '3'), ['140'])
+            self.assertEqual(read('10003', 'userDB.txt', '3'), ['100'])
+            restart()
+
+    def test_transfer_cut_off_in_sqlite(self):
+        # the transaction holding the balances and rows of a transfer is rolled back as a whole
+        with open('bank.cfg', 'w') as f:
+            f.write('[bank]\nbackend = sqlite\n')
+        restart()
+        # the database is filled from the text files before rows are made to fail
+        self.assertEqual(read('10002', 'userDB.txt', '3'), ['140'])
+
+        def transferRow(line):
+            raise KeyboardInterrupt
+
+        self.crashTransfer(sqlitestore, 'transferRow', transferRow)
+        self.assertEqual(read('10002', 'userDB.txt', '3'), ['140'])
+        self.assertEqual(read('10003', 'userDB.txt', '3'), ['100'])
+        rows = storage.repository().scanTransactions(0, date.max.toordinal())
+        self.assertEqual([row for row in rows if row[3:] == ['7', 'x\n']], [])
+        storage.repository().connection().close()
+
+    def test_cut_off_journal_line(self):
+        # the last entry lost its line break in a crash, the next entry must not be joined to it
+        self.writeJournal('10000,3,2')
+        self.assertEqual(deposit('10003', '50', 'x'), 'Successful')
+        restart()
+        self.assertEqual(read('10000', 'userDB.txt', '3'), ['300'])
+        self.assertEqual(read('10003', 'userDB.txt', '3'), ['150'])
+        self.assertEqual(read('10000', 'userDB.txt', '1'), ['John Cena'])
+
+    def test_unfinished_journal_group(self):
+        # a group lost its commit line in a crash, entries made after it must not be taken as part of it
+        self.writeJournal('begin\n10000,3,999\n')
+        self.assertEqual(deposit('10003', '50', 'x'), 'Successful')
+        restart()
+        self.assertEqual(read('10000', 'userDB.txt', '3'), ['300'])
+        self.assertEqual(read('10003', 'userDB.txt', '3'), ['150'])
+
+    def test_journal_appended_by_another_process(self):
+        # entries another process appends to the journal are applied to the index without building it again
+        self.assertEqual(deposit('10003', '50', 'x'), 'Successful')
+        index = engine.getIndex('userDB.txt')
+        with open('journal.txt', 'a') as f:
+            f.write('10000,3,400\n')
+        engine.filesChanged({'journal.txt'})
+        self.assertIs(engine.getIndex('userDB.txt'), index)
+        self.assertEqual(read('10000', 'userDB.txt', '3'), ['400'])
+        # another process emptied the journal by replacing it, the index is built again from the snapshot
+        with open('journal.new', 'w') as f:
+            f.write('10000,3,500\n')
+        os.replace('journal.new', 'journal.txt')
+        engine.filesChanged({'journal.txt'})
+        self.assertNotIn('userDB.txt', engine.accountIndex)
+        self.assertEqual(read('10000', 'userDB.txt', '3'), ['500'])
+
+    def test_change_too_long_for_record_store(self):
+        # a change that does not fit in its slot is refused and is not kept in memory either
+        self.assertEqual(useRecordStore(), 'Successful')
+        address = read('10000', 'userDB.txt', '5')
+        self.assertTrue(edit('10000', '5', 'A' * 600).startswith('Error'))
+        self.assertEqual(read('10000', 'userDB.txt', '5'), address)
+        self.assertTrue(changePass('10000', '#1' + 'a' * 600).startswith('Error'))
+        restart()
+        self.assertEqual(read('10000', 'userDB.txt', '5'), address)
+        self.assertEqual(deposit('10000', '5', 'x'), 'Successful')
+
+    def test_balance_written_in_place_by_another_process(self):
+        # another process changes a balance in place in accounts.dat, which keeps the inode and size of the file,
+        # and on a file system with a coarse clock its modification time too
+        self.assertEqual(useRecordStore(), 'Successful')
+        locks.processMode = True
+        self.assertEqual(read('10000', 'userDB.txt', '3'), ['300'])
+        before = os.stat('accounts.dat')
+        script = ('from owaisbank.locks import enableProcessLocks; from owaisbank.engine import deposit; '
+                  'enableProcessLocks(); print(deposit("10000", "5", "x"))')
+        subprocess.run([sys.executable, '-c', script], check=True, stdout=subprocess.DEVNULL,
+                       env=dict(os.environ, PYTHONPATH=root))
+        os.utime('accounts.dat', ns=(before.st_atime_ns, before.st_mtime_ns))
+        after = os.stat('accounts.dat')
+        self.assertEqual((after.st_ino, after.st_size, after.st_mtime_ns),
+                         (before.st_ino, before.st_size, before.st_mtime_ns))
+        self.assertEqual(read('10000', 'userDB.txt', '3'), ['305'])
+
+    def test_month_archived_again_cut_off(self):
+        # a month with rows added after it was archived is archived again, and the program stops after the new
+        # segment is written but before the manifest names it
+        self.assertEqual(deposit('10000', '5', 'x'), 'Successful')
+        self.assertEqual(archiveHistory('01/01/2099'), 'Successful')
+        self.assertEqual(deposit('10000', '9', 'late'), 'Successful')
+        rows = list(storage.repository().iterTransactions('10000', 0, date.max.toordinal()))
+        change = storage.repository().changeSince('10000', 0)
+
+        def writeManifest(durable=False):
+            raise KeyboardInterrupt
+
+        with mock.patch.object(partitions, 'writeManifest', writeManifest):
+            self.assertRaises(KeyboardInterrupt, archiveHistory, '01/01/2099')
+        restart()
+        self.assertEqual(list(storage.repository().iterTransactions('10000', 0, date.max.toordinal())), rows)
+        self.assertEqual(storage.repository().changeSince('10000', 0), change)
+        self.assertEqual(archiveHistory('01/01/2099'), 'Successful')
+        restart()
+        self.assertEqual(list(storage.repository().iterTransactions('10000', 0, date.max.toordinal())), rows)
+        self.assertEqual(len(os.listdir('txarchive')), len(partitions.loadManifest()))
+
+
+if __name__ == '__main__':
+    unittest.main()